@@ -1,4 +1,10 @@
-from langchain_core.messages import SystemMessage
+import functools
+import re
+from dataclasses import dataclass
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+MODEL_NAME = "gpt-3.5-turbo"
 
 # Define the base personality
 BASE_PERSONALITY = """
@@ -55,6 +61,39 @@ BEHAVIORS = {
 }
 
 
+# Precomputed system messages: the static personality always comes first and
+# the behavior last, so every prompt shares the longest possible prefix and
+# provider-side prompt caching can hit across behaviors.
+DEFAULT_BEHAVIOR = "default"
+SYSTEM_MESSAGES = {
+    DEFAULT_BEHAVIOR: SystemMessage(content=BASE_PERSONALITY),
+    **{
+        key: SystemMessage(content=f"{BASE_PERSONALITY} {behavior}")
+        for key, behavior in BEHAVIORS.items()
+    },
+}
+
+BEHAVIOR_ORDER = {key: index for index, key in enumerate(BEHAVIORS)}
+BEHAVIOR_PATTERN = re.compile("|".join(re.escape(key) for key in BEHAVIORS))
+
+
+def resolve_behavior(user_input: str) -> str:
+    """
+    Picks the behavior for a piece of user input.
+
+    Behavior names (e.g. "urgent") resolve directly; other text resolves to the
+    first behavior in BEHAVIORS whose key it mentions, else the default.
+    """
+    lower_input = user_input.lower()
+    if lower_input in SYSTEM_MESSAGES:
+        return lower_input
+
+    matches = set(BEHAVIOR_PATTERN.findall(lower_input))
+    if not matches:
+        return DEFAULT_BEHAVIOR
+    return min(matches, key=BEHAVIOR_ORDER.__getitem__)
+
+
 def get_system_message(user_input: str) -> SystemMessage:
     """
     Generate a dynamic SystemMessage based on user input.
@@ -65,16 +104,115 @@ def get_system_message(user_input: str) -> SystemMessage:
     Returns:
         SystemMessage: A system message reflecting the adapted personality.
     """
-    # Lowercase the input for case-insensitive matching
-    lower_input = user_input.lower()
+    return SYSTEM_MESSAGES[resolve_behavior(user_input)]
+
+
+@functools.cache
+def count_tokens(text: str) -> int:
+    """Counts tokens with the model's tiktoken encoding, falling back to ~4 characters per token."""
+    try:
+        import tiktoken
+
+        return len(tiktoken.encoding_for_model(MODEL_NAME).encode(text))
+    except Exception:
+        return len(text) // 4 + 1
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    A task prompt: a behavior's system message plus fixed instructions.
+
+    Variable content always goes last, after the system message and the
+    instructions, so repeated calls of a template share a stable prefix.
+    """
+
+    name: str
+    behavior: str
+    instructions: str
+
+    def messages(self, content: str, behavior: str = None) -> list:
+        """Builds the message list for one call of the template."""
+        return [
+            SYSTEM_MESSAGES[behavior or self.behavior],
+            HumanMessage(content=f"{self.instructions}\n\n{content}"),
+        ]
+
+    @property
+    def prefix_tokens(self) -> int:
+        """Tokens in the fixed part of the prompt (system message and instructions)."""
+        return count_tokens(SYSTEM_MESSAGES[self.behavior].content) + count_tokens(self.instructions)
+
+
+PROMPT_TEMPLATES = {
+    template.name: template
+    for template in (
+        PromptTemplate(
+            name="summary",
+            behavior="query",
+            instructions=(
+                "Summarize this news in a short, crypto-native style tweet. Keep it sharp, direct, and opinionated. "
+                "Use tickers, numbers, and key players. Avoid unnecessary words. Imagine you're a degenerate trader dropping alpha on Twitter.\n"
+                "Most importantly provide insights to what is going on today on the subject.\n"
+                "Again, don't use any hashtags. Emojis are fine, but sparingly.\n"
+                "Most importantly tell me what has changed on the subject matter."
+            ),
+        ),
+        PromptTemplate(
+            name="search_context",
+            behavior="urgent",
+            instructions=(
+                "You are a neutral search assistant. You are about to make a search on twitter for relevant posts on the subject below.\n"
+                "Provide a 1 word keyword only, and no other text, to fetch relevant posts on the subject matter."
+            ),
+        ),
+        PromptTemplate(
+            name="triage",
+            behavior="urgent",
+            instructions=(
+                "You triage tweets that mention you.\n"
+                "- is_bot: is the account suspicious of being a bot? If the account is asking you a question, they are most likely not a bot.\n"
+                "- intent: 'twitter' if you are asked a question you can answer by searching twitter with a one word keyword, else 'conversation'.\n"
+                "- keyword: when intent is 'twitter', the one word keyword to search with."
+            ),
+        ),
+        PromptTemplate(
+            name="conversation_context",
+            behavior=DEFAULT_BEHAVIOR,
+            instructions=(
+                "Identify if the user is being conversational in the tweet below, or they are asking you to search for something on twitter. "
+                "Return keyword 'twitter' only without the quotations if you are asked a question you can find on twitter with a one word keyword, "
+                "else return 'conversational' keyword without the quotations."
+            ),
+        ),
+        PromptTemplate(
+            name="conversation",
+            behavior="conversation",
+            instructions=(
+                "You have a conversational, witty personality, you can roast and be sarcastic with people as you like, "
+                "but most of the time one line responses are enough.\n"
+                "If they ask you about yourself and what you can do, you can reply honestly."
+            ),
+        ),
+        PromptTemplate(
+            name="sentiment",
+            behavior=DEFAULT_BEHAVIOR,
+            instructions=(
+                "Analyze the sentiment of the following tweet specifically in the context of cryptocurrency. "
+                "Classify the sentiment as one of the following:\n"
+                "- 'bullish' if the tweet shows optimism, excitement, or positive expectations about cryptocurrency prices or trends.\n"
+                "- 'bearish' if the tweet expresses pessimism, concerns, or negative expectations about cryptocurrency prices or trends.\n"
+                "- 'neutral' if the tweet does not clearly express bullish or bearish sentiment.\n\n"
+                "Provide the classification and a brief explanation of your reasoning."
+            ),
+        ),
+    )
+}
 
-    # Determine the behavior based on the user input
-    for key, behavior in BEHAVIORS.items():
-        if key in lower_input:
-            return SystemMessage(content=f"{BASE_PERSONALITY} {behavior}")
 
-    # Default behavior if no specific context matches
-    return SystemMessage(content=BASE_PERSONALITY)
+def template_token_counts() -> dict:
+    """Returns the fixed prompt tokens of every template, for per-template accounting."""
+    return {name: template.prefix_tokens for name, template in PROMPT_TEMPLATES.items()}
 
 
 # Example usage
@@ -0,0 +1,210 @@
+"""
+In-process stand-ins for the agent's external services, used by the benchmarks.
+
+Each fake answers instantly (or after a fixed simulated latency) with data
+shaped like the real client's, so hot paths can be measured offline and
+without credentials.
+"""
+
+import asyncio
+import itertools
+import time
+from types import SimpleNamespace
+
+FAKE_USER_ID = "1881212535312957440"
+
+SAMPLE_TWEETS = [
+    "@recluseai_ what's the play on $SOL this week? 🚀 #crypto https://t.co/abc123",
+    "@recluseai_ gm ser, are you even real? 👀",
+    "@recluseai_ search twitter for the latest on $ETH ETF flows\nthoughts?",
+    "RT @whale_alert: 🚨 10,000 #BTC transferred from unknown wallet to Coinbase https://t.co/xyz",
+    "@recluseai_ @friend look at this 👨‍👩‍👧 family of degens lol $DOGE $PEPE",
+]
+
+
+class FakeTwitterClient:
+    """
+    Mimics the tweepy Client methods the agent calls.
+
+    Every get_users_mentions call returns `mentions_per_page` brand-new mentions,
+    so repeated polling cycles always have work to do.
+    """
+
+    def __init__(self, mentions_per_page: int = 20, latency: float = 0.0):
+        self.mentions_per_page = mentions_per_page
+        self.latency = latency
+        self.ids = itertools.count(1_900_000_000_000_000_000)
+        self.session = SimpleNamespace(mount=lambda *args, **kwargs: None)
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _tweet(self, text: str, author_id: str = "42"):
+        tweet_id = next(self.ids)
+        return SimpleNamespace(
+            id=tweet_id,
+            text=text,
+            conversation_id=tweet_id,
+            author_id=author_id,
+            public_metrics={"like_count": tweet_id % 50, "retweet_count": tweet_id % 7, "reply_count": 1, "quote_count": 0},
+        )
+
+    def _author(self, author_id: str = "42"):
+        return SimpleNamespace(
+            id=author_id,
+            name="Degen Trader",
+            username="degen_trader",
+            description="on-chain since 2017. not financial advice.",
+            profile_image_url="https://pbs.twimg.com/profile_images/1/photo.jpg",
+            verified=False,
+            created_at=None,
+            public_metrics={"followers_count": 120, "following_count": 300, "tweet_count": 4000},
+        )
+
+    def get_user(self, **kwargs):
+        self._wait()
+        return SimpleNamespace(data={"id": FAKE_USER_ID, "name": "RecluseAI", "username": "recluseai_"})
+
+    def get_users_mentions(self, **kwargs):
+        self._wait()
+        data = [
+            self._tweet(SAMPLE_TWEETS[i % len(SAMPLE_TWEETS)])
+            for i in range(self.mentions_per_page)
+        ]
+        return SimpleNamespace(
+            data=data,
+            includes={"users": [self._author()]},
+            meta={"newest_id": str(data[0].id) if data else None},
+        )
+
+    def search_recent_tweets(self, **kwargs):
+        self._wait()
+        data = [
+            self._tweet(SAMPLE_TWEETS[i % len(SAMPLE_TWEETS)] + f" #{i}")
+            for i in range(kwargs.get("max_results", 100))
+        ]
+        return SimpleNamespace(data=data, includes={}, meta={})
+
+    def create_tweet(self, **kwargs):
+        self._wait()
+        return SimpleNamespace(data={"id": str(next(self.ids)), "text": kwargs.get("text")})
+
+
+class FakeAgent:
+    """
+    Mimics the LangGraph agent and the chat model.
+
+    Invoked with {"messages": [...]} it answers like the agent (the state with a
+    final message appended); invoked with a message list it answers like the
+    model (a single message). Either way the reply carries usage metadata.
+    """
+
+    def __init__(self, reply: str = "$SOL looking spicy. Not your exit liquidity.", latency: float = 0.0):
+        self.reply = reply
+        self.latency = latency
+
+    def respond(self, payload):
+        message = SimpleNamespace(
+            content=self.reply,
+            usage_metadata={"input_tokens": 900, "output_tokens": 30, "total_tokens": 930},
+        )
+        if isinstance(payload, list):
+            return message
+        return {"messages": [*payload["messages"], message]}
+
+    def invoke(self, payload, config=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.respond(payload)
+
+    async def ainvoke(self, payload, config=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.respond(payload)
+
+
+class FakeTriageModel:
+    """Mimics model.with_structured_output(MentionTriage, include_raw=True)."""
+
+    def __init__(self, triage, latency: float = 0.0):
+        self.triage = triage
+        self.latency = latency
+
+    def respond(self):
+        raw = SimpleNamespace(usage_metadata={"input_tokens": 200, "output_tokens": 20, "total_tokens": 220})
+        return {"raw": raw, "parsed": self.triage.model_copy(), "parsing_error": None}
+
+    def invoke(self, messages, config=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.respond()
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.respond()
+
+
+class FakeQuery:
+    """Chainable query builder covering the supabase-py calls used on recluse_mentions."""
+
+    def __init__(self, rows: dict):
+        self.rows = rows
+        self.operation = None
+        self.payload = None
+        self.ids = None
+        self.ignore_duplicates = False
+
+    def select(self, *columns):
+        self.operation = "select"
+        return self
+
+    def insert(self, payload):
+        self.operation, self.payload = "upsert", payload
+        return self
+
+    def upsert(self, payload, on_conflict=None, ignore_duplicates=False):
+        self.operation, self.payload = "upsert", payload
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, payload):
+        self.operation, self.payload = "update", payload
+        return self
+
+    def eq(self, column, value):
+        self.ids = [value]
+        return self
+
+    def in_(self, column, values):
+        self.ids = list(values)
+        return self
+
+    def execute(self):
+        if self.operation == "select":
+            ids = self.rows if self.ids is None else self.ids
+            return SimpleNamespace(data=[dict(self.rows[i]) for i in ids if i in self.rows])
+
+        if self.operation == "upsert":
+            payload = self.payload if isinstance(self.payload, list) else [self.payload]
+            for row in payload:
+                if self.ignore_duplicates and row["id"] in self.rows:
+                    continue
+                self.rows[row["id"]] = dict(row)
+            return SimpleNamespace(data=payload)
+
+        for tweet_id in self.ids or []:
+            if tweet_id in self.rows:
+                self.rows[tweet_id].update(self.payload)
+        return SimpleNamespace(data=[])
+
+
+class FakeSupabase:
+    """Mimics the supabase Client's table() entry point with an in-memory table per name."""
+
+    def __init__(self):
+        self.tables = {}
+
+    def table(self, name: str):
+        return FakeQuery(self.tables.setdefault(name, {}))
@@ -0,0 +1,207 @@
+"""
+Microbenchmarks for the code that runs on every polling cycle.
+
+Runs entirely in-process: tweepy, the LangGraph agent and Supabase are
+replaced by the fakes in src/benchmarks/fakes.py, and Redis by fakeredis
+(with Lua support, for the rate limiter and throttle scripts).
+
+    pip install -r src/benchmarks/requirements.txt
+    python -m src.benchmarks.hot_paths
+    python -m src.benchmarks.hot_paths --only parse_tweet --iterations 20000
+
+For each benchmark it reports ops/sec, p50/p99 latency and, from a second
+traced pass, peak traced memory and bytes still allocated per op.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import re
+import statistics
+import time
+import tracemalloc
+
+import emoji
+from fakeredis import aioredis
+
+from src import config, main
+from src.agent_personality import get_system_message
+from src.benchmarks.fakes import (
+    SAMPLE_TWEETS,
+    FakeAgent,
+    FakeSupabase,
+    FakeTriageModel,
+    FakeTwitterClient,
+)
+from src.services import services
+from src.utils import functions, rate_limiter
+from src.utils.agent_helpers import MentionTriage
+from src.utils.functions import can_make_request, parse_tweet, parse_tweets, update_usage
+from src.utils.mention_queue import ensure_mention_group, read_new_mentions
+from src.twitter_functions import is_rate_limited, read_mentions
+
+
+def install_fakes(redis, mentions_per_page: int = 20):
+    """Points every service the hot paths use at an in-process fake."""
+    config.redis = redis
+    main.redis = redis
+
+    services.twitter = FakeTwitterClient(mentions_per_page=mentions_per_page)
+    services.supabase = FakeSupabase()
+    services.agent = services.model = FakeAgent()
+    services.triage_model = FakeTriageModel(
+        MentionTriage(is_bot=False, intent="conversation")
+    )
+
+    # Budgets large enough that the benchmarks measure the limiter, not its waits.
+    rate_limiter.ENDPOINT_LIMITS = {
+        endpoint: (10**9, window)
+        for endpoint, (_, window) in rate_limiter.ENDPOINT_LIMITS.items()
+    }
+    functions.OPENAI_RPM_LIMIT = 10**9
+    functions.OPENAI_TPM_LIMIT = 10**12
+
+
+async def check_fakes(redis, mentions_per_page: int = 20):
+    """
+    Fails loudly if the fakes no longer satisfy the code under test.
+
+    The hot paths catch and log their own errors, so a fake missing a field
+    would otherwise be benchmarked as a fast error path.
+    """
+    mentions = await read_mentions(config.TWITTER_USERNAME, redis)
+    assert mentions["status"] == "success", mentions
+    assert len(mentions["mentions_tweet"]) == mentions_per_page, mentions
+
+
+async def poll_and_process(redis):
+    """One poller cycle, one worker batch over everything it queued, then a reconciler pass."""
+    await main.poll_mentions()
+    entries = await read_new_mentions(redis, "bench", count=1000, block_ms=None)
+    assert entries, "poll_mentions queued nothing; run without --only to see its errors"
+    await main.process_mentions(entries)
+    await main.reconcile_statuses()
+
+
+def baseline_parse_tweet(tweet_text: str):
+    """parse_tweet before the single-scan tokenizer, kept as the reference for its benchmarks."""
+    hashtags = re.findall(r"#\w+", tweet_text)
+    mentions = re.findall(r"@\w+", tweet_text)
+    links = re.findall(r"https?://\S+", tweet_text)
+    emojis = [char for char in tweet_text if char in emoji.EMOJI_DATA]
+    cleaned_text = re.sub(r"(@\w+|#\w+|https?://\S+)", "", tweet_text).strip()
+    lines = [line.strip() for line in cleaned_text.split("\n") if line.strip()]
+    return {
+        "original_tweet": tweet_text,
+        "parsed_data": {
+            "hashtags": hashtags,
+            "mentions": mentions,
+            "links": links,
+            "emojis": emojis,
+            "main_text_lines": lines,
+        },
+    }
+
+
+async def call(fn):
+    result = fn()
+    if asyncio.iscoroutine(result):
+        await result
+
+
+async def measure(name: str, fn, iterations: int):
+    """Times `iterations` calls of fn, then repeats a tenth of them under tracemalloc."""
+    await call(fn)  # warm up caches and lazily compiled patterns
+
+    timings = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        begin = time.perf_counter_ns()
+        await call(fn)
+        timings.append(time.perf_counter_ns() - begin)
+    elapsed = time.perf_counter() - start
+
+    traced = max(1, iterations // 10)
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for _ in range(traced):
+        await call(fn)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "name": name,
+        "ops": iterations / elapsed,
+        "p50": statistics.median(timings) / 1000,
+        "p99": timings[min(len(timings) - 1, int(len(timings) * 0.99))] / 1000,
+        "peak_kib": (peak - before) / 1024,
+        "retained_per_op": (after - before) / traced,
+    }
+
+
+def benchmarks(redis):
+    """Returns (name, callable, default iterations) for every benchmark."""
+    batch = SAMPLE_TWEETS * 20
+    plain = ("the quick brown fox jumps over the lazy dog " * 7)[:280]
+
+    return [
+        ("parse_tweet", lambda: parse_tweet(SAMPLE_TWEETS[0]), 20000),
+        ("parse_tweet[baseline]", lambda: baseline_parse_tweet(SAMPLE_TWEETS[0]), 20000),
+        ("parse_tweet[280]", lambda: parse_tweet(plain), 20000),
+        ("parse_tweet[280,baseline]", lambda: baseline_parse_tweet(plain), 20000),
+        ("parse_tweets[100]", lambda: parse_tweets(batch), 500),
+        ("parse_tweets[100,baseline]", lambda: [baseline_parse_tweet(t) for t in batch], 500),
+        ("get_system_message", lambda: get_system_message("give me a query on $BTC"), 20000),
+        ("is_rate_limited", lambda: is_rate_limited(redis, "mentions"), 2000),
+        ("can_make_request", lambda: can_make_request(redis, 500), 2000),
+        ("update_usage", lambda: update_usage(redis, 930, 500), 2000),
+        (
+            "process_single_mention",
+            lambda: main.process_single_mention(SAMPLE_TWEETS[1], tweet_id=1, conversation_id=1),
+            300,
+        ),
+        ("poll_and_process[20]", lambda: poll_and_process(redis), 30),
+    ]
+
+
+def report(results):
+    header = f"{'benchmark':<26}{'ops/sec':>12}{'p50 µs':>12}{'p99 µs':>12}{'peak KiB':>12}{'B/op kept':>12}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['name']:<26}{r['ops']:>12.1f}{r['p50']:>12.1f}{r['p99']:>12.1f}"
+            f"{r['peak_kib']:>12.1f}{r['retained_per_op']:>12.0f}"
+        )
+
+
+async def run(only=None, iterations=None):
+    redis = aioredis.FakeRedis(decode_responses=True)
+    install_fakes(redis)
+    await ensure_mention_group(redis)
+    await check_fakes(redis)
+
+    results = []
+    for name, fn, default_iterations in benchmarks(redis):
+        if only and only not in name:
+            continue
+        results.append(await measure(name, fn, iterations or default_iterations))
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the agent's hot paths offline.")
+    parser.add_argument("--only", help="Run benchmarks whose name contains this string.")
+    parser.add_argument("--iterations", type=int, help="Override every benchmark's iteration count.")
+    args = parser.parse_args()
+
+    # Keep per-mention logging out of the timings.
+    logging.getLogger().setLevel(logging.WARNING)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = asyncio.run(run(args.only, args.iterations))
+
+    report(results)
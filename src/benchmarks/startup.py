@@ -0,0 +1,78 @@
+"""
+Import-time budgets for the worker and API entry points.
+
+Imports each entry module in a fresh interpreter under `python -X importtime`
+and reports its cumulative import time and heaviest dependencies. An entry
+point fails if it exceeds its budget, or if it eagerly imports one of the
+service SDKs that src/services.py is meant to load on first use.
+
+    python -m src.benchmarks.startup
+    python -m src.benchmarks.startup --top 20
+
+Exits non-zero when any entry point is over budget.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+# Cumulative import budget per entry point, in milliseconds
+IMPORT_BUDGETS_MS = {
+    "src.main": 1500,  # worker
+    "src.twitter_functions": 1500,  # API
+}
+
+# Packages that must not load until a service is first used
+LAZY_PACKAGES = (
+    "langchain_openai",
+    "langchain_community",
+    "langgraph",
+    "supabase",
+    "tweepy",
+)
+
+
+def import_times(module: str) -> dict:
+    """Imports `module` in a fresh interpreter, returning cumulative µs per imported package."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    if result.returncode:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, package = line.split("|")
+        times[package.strip()] = int(cumulative)
+    return times
+
+
+def check(module: str, budget_ms: float, top: int) -> bool:
+    times = import_times(module)
+    total_ms = times[module] / 1000
+    eager = sorted(
+        package for package in times if package.split(".")[0] in LAZY_PACKAGES
+    )
+
+    ok = total_ms <= budget_ms and not eager
+    print(f"{module}: {total_ms:.0f} ms (budget {budget_ms:.0f} ms) {'ok' if ok else 'FAIL'}")
+    for package, micros in sorted(times.items(), key=lambda item: -item[1])[1 : top + 1]:
+        print(f"    {micros / 1000:>8.1f} ms  {package}")
+    if eager:
+        print(f"    eagerly imported: {', '.join(eager)}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check import-time budgets of the entry points.")
+    parser.add_argument("--top", type=int, default=10, help="Heaviest imports to list per entry point.")
+    args = parser.parse_args()
+
+    results = [check(module, budget, args.top) for module, budget in IMPORT_BUDGETS_MS.items()]
+    sys.exit(0 if all(results) else 1)
@@ -1,25 +1,27 @@
+import inspect
 import os
 from dotenv import load_dotenv
-from langgraph.prebuilt import create_react_agent
-from langgraph.checkpoint.memory import MemorySaver
-from src.agent_personality import get_system_message
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from supabase import create_client, Client
-from tenacity import retry, stop_after_attempt, wait_exponential
-
-import time
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+from redis.asyncio import Redis
+from src.utils.functions import (
+    estimate_tokens,
+    report_rate_limited,
+    update_usage,
+    wait_for_capacity,
+)
+
 import openai
 
 load_dotenv()
 
 
-url: str = os.getenv("SUPABASE_URL")
-key: str = os.getenv("SUPABASE_KEY")
-supabase: Client = create_client(url, key)
+# Clients for these services are built lazily, see src/services.py
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
 # redis url
 redis_url = os.getenv("REDIS_URL", "redis://localhost")
+redis = None  # shared async client, see get_redis()
 
 #twitter api
 TWITTER_AUTH_CONSUMER_KEY = os.getenv("TWITTER_AUTH_CONSUMER_KEY")
@@ -27,6 +29,8 @@ TWITTER_AUTH_CONSUMER_SECRET = os.getenv("TWITTER_AUTH_CONSUMER_SECRET")
 TWITTER_AUTH_BEARER_TOKEN = os.getenv("TWITTER_AUTH_BEARER_TOKEN")
 TWITTER_AUTH_ACCESS_TOKEN = os.getenv("TWITTER_AUTH_ACCESS_TOKEN")
 TWITTER_AUTH_ACCESS_TOKEN_SECRET = os.getenv("TWITTER_AUTH_ACCESS_TOKEN_SECRET")
+TWITTER_USERNAME = os.getenv("TWITTER_USERNAME", "recluseai_")  # account the agent runs as
+TWITTER_MAX_WORKERS = int(os.getenv("TWITTER_MAX_WORKERS", "8"))  # threads for blocking tweepy calls
 
 # openai api
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -36,51 +40,142 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 # tavily api key
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 
+# port the worker serves the API and /metrics on (Heroku sets PORT for web dynos)
+API_PORT = os.getenv("API_PORT", os.getenv("PORT"))
+
+# mention processing
+MENTION_CONCURRENCY = int(os.getenv("MENTION_CONCURRENCY", "4"))  # mentions handled in parallel
+MENTION_TIMEOUT = float(os.getenv("MENTION_TIMEOUT", "120"))  # seconds before a mention is abandoned
+MENTION_RECLAIM_AFTER = float(os.getenv("MENTION_RECLAIM_AFTER", str(MENTION_TIMEOUT + 60)))  # seconds before another worker retries an unacked mention
+MENTION_MAX_DELIVERIES = int(os.getenv("MENTION_MAX_DELIVERIES", "5"))  # attempts before a mention is dead-lettered
+RECONCILE_INTERVAL = float(os.getenv("RECONCILE_INTERVAL", "15"))  # seconds between batched status writes to Supabase
+
+# which loops this process runs: "poller" (fetch mentions), "worker" (reply to them) or "all"
+AGENT_ROLE = os.getenv("AGENT_ROLE", "all")
+POLLER_LEASE_TTL = float(os.getenv("POLLER_LEASE_TTL", "30"))  # seconds before a dead poller's lease passes to a standby
+
+# agent memory
+AGENT_MEMORY_MAX_THREADS = int(os.getenv("AGENT_MEMORY_MAX_THREADS", "500"))  # conversations kept in memory
+AGENT_MEMORY_MAX_AGE = int(os.getenv("AGENT_MEMORY_MAX_AGE", str(6 * 60 * 60)))  # seconds an idle conversation is kept
+AGENT_HISTORY_MESSAGES = int(os.getenv("AGENT_HISTORY_MESSAGES", "10"))  # messages of history kept and sent to the model
+
+# keyword search
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "600"))  # seconds a search summary stays fresh
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "2000"))  # tweet tokens sent for summarization
+SEARCH_MAX_PAGES = int(os.getenv("SEARCH_MAX_PAGES", "3"))  # search result pages fetched to fill the summary budget
+
+# user lookups
+PROFILE_CACHE_TTL = int(os.getenv("PROFILE_CACHE_TTL", "3600"))  # seconds a user profile stays fresh
+TIMELINE_CACHE_TTL = int(os.getenv("TIMELINE_CACHE_TTL", "300"))  # seconds a user's recent tweets stay fresh
+USER_SCAN_MAX_PAGES = int(os.getenv("USER_SCAN_MAX_PAGES", "5"))  # pages of a user's tweets scanned per request
+HOME_TIMELINE_SIZE = int(os.getenv("HOME_TIMELINE_SIZE", "800"))  # home timeline tweets kept in memory
+HOME_TIMELINE_REFRESH = float(os.getenv("HOME_TIMELINE_REFRESH", "60"))  # minimum seconds between home timeline fetches
+
+# tweet search index
+TWEET_INDEX_SIZE = int(os.getenv("TWEET_INDEX_SIZE", "50000"))  # ingested tweets kept searchable
+TWEET_INDEX_PERSIST = os.getenv("TWEET_INDEX_PERSIST", "false").lower() == "true"  # share indexed tweets through Redis
+
+# web search (tavily)
+WEB_SEARCH_TTL_PRICE = int(os.getenv("WEB_SEARCH_TTL_PRICE", "60"))  # seconds price/market results stay fresh
+WEB_SEARCH_TTL_NEWS = int(os.getenv("WEB_SEARCH_TTL_NEWS", "900"))  # seconds news results stay fresh
+WEB_SEARCH_TTL_DEFAULT = int(os.getenv("WEB_SEARCH_TTL_DEFAULT", str(6 * 60 * 60)))  # seconds other results stay fresh
+WEB_SEARCH_CACHE_SIZE = int(os.getenv("WEB_SEARCH_CACHE_SIZE", "256"))  # results kept in process memory
+
+def thread_config(conversation_id) -> dict:
+    """Returns the agent run config for a conversation's own memory thread."""
+    return {"configurable": {"thread_id": f"conversation:{conversation_id}"}}
+
+
+def get_redis() -> Redis:
+    """Returns the process-wide async Redis client, creating it on first use."""
+    global redis
+    if redis is None:
+        redis = Redis.from_url(redis_url, decode_responses=True)
+    return redis
+
+
+def tokens_used(response, default: int) -> int:
+    """Reads the total tokens reported by a model response, falling back to `default`."""
+    if isinstance(response, dict):
+        if "raw" in response:  # with_structured_output(include_raw=True)
+            response = response["raw"]
+        elif response.get("messages"):
+            response = response["messages"][-1]
+
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        return usage.get("total_tokens", default)
+    return default
+
+
+async def throttled_call(prompt: str, fn, *args, **kwargs):
+    """
+    Calls an OpenAI-backed function behind the shared Redis token bucket.
+
+    Capacity is reserved from an estimate of the prompt before the call and
+    reconciled with the reported token usage afterwards. A 429 backs off the
+    shared rate for every process before being re-raised.
+
+    Args:
+        prompt (str): The prompt text, used to estimate token usage.
+        fn: The function making the model call, e.g. services.agent.ainvoke.
+            Coroutine functions are awaited, so the event loop keeps serving
+            other mentions while the model answers.
+        *args, **kwargs: Arguments passed through to fn.
+    """
+    redis_client = get_redis()
+    estimated = estimate_tokens(prompt)
+    await wait_for_capacity(redis_client, estimated)
 
-# Configure AI model and memory
-model = ChatOpenAI(
-    model_name="gpt-3.5-turbo", openai_api_key=OPENAI_API_KEY, temperature=0.7
-).with_config({"run_name": "RecluseAI"})
-
-memory = MemorySaver()
-thread_id = "test_thread"
-config = {"configurable": {"thread_id": thread_id}}
-
-
-# Agent setup
-agent_executor = create_react_agent(
-    tools=[],
-    model=model,
-    checkpointer=memory,
-    state_modifier=get_system_message("humour"),
-)
-
-
-last_request_time = time.time()
-REQUEST_INTERVAL = 5  # 5 seconds between requests
-
-# Exponential backoff: Retries up to 5 times with increasing delays (1s, 2s, 4s, 8s...)
-@retry(wait=wait_exponential(multiplier=1, min=1, max=10), stop=stop_after_attempt(5))
-def call_openai(prompt):
-    response = agent_executor.invoke(
-        {"messages": [HumanMessage(content=prompt)]},
-        config=config
-    )
+    try:
+        response = fn(*args, **kwargs)
+        if inspect.isawaitable(response):
+            response = await response
+    except openai.RateLimitError:
+        await report_rate_limited(redis_client)
+        raise
+
+    await update_usage(redis_client, tokens_used(response, estimated), estimated)
     return response
 
-def call_openai_with_throttling(prompt):
-    global last_request_time, REQUEST_INTERVAL
 
-    # Ensure a gap between API calls
-    time_since_last_request = time.time() - last_request_time
-    if time_since_last_request < REQUEST_INTERVAL:
-        time.sleep(REQUEST_INTERVAL - time_since_last_request)
+async def throttled_stream(prompt: str, fn, *args, **kwargs):
+    """
+    Streams an OpenAI-backed call behind the shared Redis token bucket.
+
+    The streaming counterpart of throttled_call: chunks are yielded as they
+    arrive, and usage is reconciled once the stream ends (or is abandoned by
+    the caller) from the usage reported on the aggregated chunks.
 
-    last_request_time = time.time()
+    Args:
+        prompt (str): The prompt text, used to estimate token usage.
+        fn: A function returning an async iterator of chunks, e.g. services.model.astream.
+        *args, **kwargs: Arguments passed through to fn.
+    """
+    redis_client = get_redis()
+    estimated = estimate_tokens(prompt)
+    await wait_for_capacity(redis_client, estimated)
 
+    response = None
     try:
-        return call_openai(prompt)  # Call OpenAI with retry logic
-    except openai.error.RateLimitError:
-        print("⚠️ Rate limit hit! Increasing interval to prevent further 429 errors.")
-        REQUEST_INTERVAL += 2  # Increase delay dynamically
-        return None
+        async for chunk in fn(*args, **kwargs):
+            response = chunk if response is None else response + chunk
+            yield chunk
+    except openai.RateLimitError:
+        await report_rate_limited(redis_client)
+        raise
+    finally:
+        await update_usage(redis_client, tokens_used(response, estimated), estimated)
+
+
+# Exponential backoff for transient OpenAI errors: up to 5 attempts, waiting
+# 1s, 2s, 4s, 8s between them. 429s are not retried here; throttled_call backs
+# off the shared rate for every process instead.
+openai_retry = retry(
+    wait=wait_exponential(multiplier=1, min=1, max=10),
+    stop=stop_after_attempt(5),
+    retry=retry_if_exception_type(
+        (openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)
+    ),
+    reraise=True,
+)
@@ -1,28 +1,64 @@
+import argparse
 import asyncio
 import traceback
-from redis.asyncio import Redis
+import uvicorn
 
 # Relative imports
-from src.config import agent_executor, config, supabase, redis_url, call_openai, call_openai_with_throttling
+from src.config import (
+    get_redis,
+    AGENT_ROLE,
+    MENTION_CONCURRENCY,
+    MENTION_MAX_DELIVERIES,
+    MENTION_RECLAIM_AFTER,
+    MENTION_TIMEOUT,
+    POLLER_LEASE_TTL,
+    RECONCILE_INTERVAL,
+    TWITTER_USERNAME,
+    API_PORT,
+)
 from src.twitter_functions import (
     search_for_tweets,
     fetch_10_recent_tweets,
     reply_to_tweet,
     retweet_tweet,
     read_mentions,
+    save_mentions_cursor,
+    app,
+)
+from src.utils.agent_helpers import MentionTriage, triage_mention, respond_to_conversation
+from src.utils.functions import cache_bot_verdict, prefilter_author
+from src.utils.metrics import mention_queue_depth, mentions_total, track_stage
+from src.utils.leader import LeaderLease
+from src.utils.mention_queue import (
+    ack_mentions,
+    claim_stale_mentions,
+    consumer_name,
+    ensure_mention_group,
+    publish_mentions,
+    read_new_mentions,
+)
+from src.utils.reply_outbox import mark_reconciled, sent_replies, unreconciled_replies
+from src.utils.mention_state import (
+    MentionStatusBuffer,
+    fetch_mention_states,
+    insert_new_mentions,
 )
-from src.utils.agent_helpers import provide_conversation_context, respond_to_conversation
 
 # Global Redis declaration
 redis = None
 
+# Pending bot_status/replied_status writes, flushed by the reconciler
+status_buffer = MentionStatusBuffer()
+
+# Replied mentions reconciled per reconciler pass
+RECONCILE_BATCH_SIZE = 500
+
 
 async def init_redis():
     """Initialize Redis connection."""
     global redis
-    redis = await Redis.from_url(
-        redis_url, decode_responses=True    
-    )
+    redis = get_redis()
+    await redis.ping()
     print("Redis connected!")
 
 
@@ -34,129 +70,308 @@ async def close_redis():
         print("Redis connection closed!")
 
 
-async def identify_bot(tweet):
-    """Identify if a tweet is from a bot."""
-    try:
-        prompt = """
-        Identify if the account is suspicious of being a bot.
-        If account is asking you a question, they are most likely not a bot. So proceed.
-        If the account is a bot, output 'suspicious' without the quotations.
-        If the account is not a bot, output 'proceed' without the quotations.
-        """
-
-        print("Processing tweet for bot detection:", tweet)
-        decision = call_openai_with_throttling(f"{prompt}\n\n{tweet}")
-        decision_return_value = decision["messages"][-1].content
-
-        if (
-            decision_return_value
-            and decision_return_value.strip().lower() == "suspicious"
-        ):
-            return True
-        return False
-
-    except Exception as e:
-        print(f"Error processing tweet: {e}")
-        traceback.print_exc()
-        return False
+async def process_single_mention(tweet, tweet_id, conversation_id=None, author=None):
+    """
+    Process a single tweet by invoking the agent and deciding whether to reply or retweet.
 
+    Returns:
+        dict: The bot_status to write back to recluse_mentions, or None.
+        Replies are recorded in the reply outbox, which reconciles
+        replied_status on its own.
 
-async def process_single_mention(tweet, tweet_id):
-    """Process a single tweet by invoking the agent and deciding whether to reply or retweet."""
+    Raises:
+        Whatever failed (the model, Twitter, Supabase, Redis), so the mention
+        is left unacknowledged and retried.
+    """
     try:
-        is_bot = await identify_bot(tweet)
-        print("Bot detection result:", is_bot)
-        
-        if is_bot:
-            supabase.table("recluse_mentions").update({"bot_status": True}).eq("id", tweet_id).execute()
-
-        if not is_bot:
-            conversation_context = await provide_conversation_context(tweet)
-            print("Conversation context result:", conversation_context)
-
-            if conversation_context.lower().strip() == "conversation":
-                response = respond_to_conversation(tweet)
-                print("AI response conversation:", response)
+        # Clear bots and clear humans are settled from profile metadata
+        # without an LLM round-trip; only ambiguous authors reach the model.
+        with track_stage("bot_prefilter"):
+            verdict = await prefilter_author(redis, author) if author else None
+        if verdict == "bot":
+            mentions_total.inc(result="bot")
+            return {"bot_status": True}
+
+        with track_stage("triage"):
+            triage = await triage_mention(tweet, check_bot=verdict != "human")
+        print("Triage result:", triage)
+
+        if triage is None:
+            # Reply as a conversation, but a failed call says nothing about the author
+            triage = MentionTriage(is_bot=False, intent="conversation")
+        elif author and verdict is None:
+            await cache_bot_verdict(redis, author["id"], "bot" if triage.is_bot else "human")
+
+        if triage.is_bot:
+            mentions_total.inc(result="bot")
+            return {"bot_status": True}
+
+        if triage.intent == "conversation":
+            with track_stage("conversation"):
+                response = await respond_to_conversation(
+                    tweet, conversation_id=conversation_id or tweet_id
+                )
+            print("AI response conversation:", response)
 
-                if response:
+            if response:
+                with track_stage("reply"):
                     await reply_to_tweet(
                         tweet_id=tweet_id, message=response, redis=redis
                     )
-                    
-                    supabase.table("recluse_mentions").update(
-                        {"replied_status": True}
-                    ).eq("id", tweet_id).execute()
-                    print("Tweet replied to and database updated.")
-
-            elif conversation_context.lower().strip() == "twitter":
-                response = await search_for_tweets(redis, keyword=tweet, count=40)
-                tweet_reply = response.get("response", "No relevant results found.")
+                print("Tweet replied to.")
+                mentions_total.inc(result="replied")
+                return None
+
+        elif triage.intent == "twitter":
+            with track_stage("search"):
+                response = await search_for_tweets(
+                    redis, keyword=tweet, count=40, search_query=triage.keyword
+                )
+            tweet_reply = response.get("response", "No relevant results found.")
 
+            with track_stage("reply"):
                 await reply_to_tweet(
                     tweet_id=tweet_id, message=tweet_reply, redis=redis
                 )
-                supabase.table("recluse_mentions").update({"replied_status": True}).eq(
-                    "id", tweet_id
-                ).execute()
-                print("Query-based tweet reply sent.")
+            print("Query-based tweet reply sent.")
+            mentions_total.inc(result="replied")
+            return None
+
+        mentions_total.inc(result="no_reply")
+        return None
 
     except Exception as e:
         print(f"Error processing tweet: {e}")
         traceback.print_exc()
+        mentions_total.inc(result="error")
+        raise
+
+
+async def process_mention_with_limit(semaphore, tweet):
+    """Process a mention once a worker slot is free, abandoning it after MENTION_TIMEOUT."""
+    try:
+        async with semaphore:
+            return await asyncio.wait_for(
+                process_single_mention(
+                    tweet["original_tweet"],
+                    tweet_id=tweet["id"],
+                    conversation_id=tweet.get("conversation_id"),
+                    author=tweet.get("author"),
+                ),
+                timeout=MENTION_TIMEOUT,
+            )
+    except asyncio.TimeoutError:
+        mentions_total.inc(result="timeout")
+        raise
+    finally:
+        mention_queue_depth.dec()
 
 
-async def process_mentions():
-    """Fetch and respond to Twitter mentions."""
+async def poll_mentions():
+    """Fetch new Twitter mentions and queue them for the reply workers."""
     try:
         print("Checking mentions...")
-        mentions = await read_mentions("recluseai_", redis)
+        mentions = await read_mentions(TWITTER_USERNAME, redis)
 
-        for tweet in mentions["mentions_tweet"]:
-            tweet_id = tweet["id"]
+        tweets = mentions["mentions_tweet"]
+        states = await fetch_mention_states(tweet["id"] for tweet in tweets)
 
-            response = (
-                supabase.table("recluse_mentions")
-                .select("*")
-                .eq("id", tweet_id)
-                .execute()
-            )
+        pending = []
+        for tweet in tweets:
+            tweet_id = tweet["id"]
+            state = states.get(tweet_id)
 
-            if response.data:
-                is_bot =  response.data[0].get("bot_status")
-                is_replied = response.data[0].get("replied_status")
-                
+            if state:
                 # Check if tweet is a bot
-                if is_bot:
-                    # print("is bot: ", is_bot)
+                if state.get("bot_status"):
                     print(f"Tweet {tweet_id} is from a bot. Skipping...")
                     continue
-                
+
                 # Check if the tweet has been replied to
-                if is_replied:
+                if state.get("replied_status"):
                     print(f"Tweet {tweet_id} has already been replied to. Skipping...")
                     continue
 
+            pending.append(tweet)
+
+        await insert_new_mentions(
+            tweet["id"] for tweet in pending if tweet["id"] not in states
+        )
+
+        # Once queued, a mention is the stream's responsibility: workers retry
+        # it until it is acked, so the cursor can move on straight away.
+        queued = await publish_mentions(redis, pending)
+        print(f"Queued {queued} new mentions.")
+        await save_mentions_cursor(
+            redis, TWITTER_USERNAME, mentions["newest_id"], mentions.get("backfill")
+        )
+
+    except Exception as e:
+        print(f"Error polling mentions: {e}")
+        traceback.print_exc()
+
+
+async def process_mentions(entries):
+    """
+    Respond to a batch of queued mentions, then acknowledge them.
+
+    Mentions run concurrently, bounded by MENTION_CONCURRENCY. Only mentions
+    that were answered, skipped as bots or needed no reply are acknowledged.
+    One that fails or times out is left pending, so a worker reclaims it once
+    it has been idle for MENTION_RECLAIM_AFTER, until MENTION_MAX_DELIVERIES
+    sends it to the dead-letter stream.
+    """
+    done = []
+    try:
+        # A reclaimed mention may have been answered before its worker died;
+        # the outbox knows even if replied_status hasn't been reconciled yet.
+        tweet_ids = [tweet["id"] for _, tweet in entries]
+        states = await fetch_mention_states(tweet_ids)
+        sent = await sent_replies(redis, tweet_ids)
+
+        pending = []
+        for entry_id, tweet in entries:
+            state = states.get(tweet["id"]) or {}
+            if state.get("bot_status") or state.get("replied_status") or tweet["id"] in sent:
+                done.append(entry_id)
             else:
-                supabase.table("recluse_mentions").insert(
-                    {"id": tweet_id, "replied_status": False}
-                ).execute()
-            await process_single_mention(tweet["original_tweet"], tweet_id=tweet_id)
+                pending.append((entry_id, tweet))
+
+        semaphore = asyncio.Semaphore(MENTION_CONCURRENCY)
+        mention_queue_depth.inc(len(pending))
+        tasks = [
+            asyncio.create_task(process_mention_with_limit(semaphore, tweet))
+            for _, tweet in pending
+        ]
+
+        # Status updates are queued in mention order as results arrive.
+        for (entry_id, tweet), task in zip(pending, tasks):
+            try:
+                status = await task
+            except asyncio.TimeoutError:
+                print(f"Tweet {tweet['id']} timed out after {MENTION_TIMEOUT}s. Will be retried.")
+                continue
+            except Exception as e:
+                print(f"Tweet {tweet['id']} failed: {e}. Will be retried.")
+                continue
+
+            if status:
+                status_buffer.add(tweet["id"], status)
+            done.append(entry_id)
 
     except Exception as e:
         print(f"Error processing mentions: {e}")
         traceback.print_exc()
 
+    finally:
+        # Replies are already durable in the outbox; bot statuses are written
+        # by the reconciler.
+        await ack_mentions(redis, done)
 
-async def main():
-    """Main loop: Start AI agent and process mentions in a loop."""
-    print("Starting RecluseAI Twitter agent...")
 
-    await init_redis()
+async def reconcile_statuses():
+    """Writes buffered bot statuses and outbox replies to recluse_mentions in batches."""
+    try:
+        replied = await unreconciled_replies(redis, RECONCILE_BATCH_SIZE)
+        for tweet_id in replied:
+            status_buffer.add(tweet_id, {"replied_status": True})
+
+        written = await status_buffer.flush()
+        await mark_reconciled(redis, set(replied).intersection(written))
+    except Exception as e:
+        print(f"Error reconciling mention statuses: {e}")
+        traceback.print_exc()
 
+
+async def run_reconciler():
+    """Reconcile mention statuses every RECONCILE_INTERVAL seconds, off the reply path."""
     try:
         while True:
-            await process_mentions()
-            await asyncio.sleep(90)  # Wait for 1.5 minutes before checking again
+            await asyncio.sleep(RECONCILE_INTERVAL)
+            await reconcile_statuses()
+    finally:
+        await reconcile_statuses()
+
+
+async def run_poller():
+    """
+    Poll for mentions every 90 seconds while this process holds the poller lease.
+
+    Any number of processes can run the poller; one leads and the rest stand
+    by, taking over within POLLER_LEASE_TTL if the leader dies.
+    """
+    lease = LeaderLease(redis, "mention_poller", POLLER_LEASE_TTL)
+    await lease.try_acquire()
+    heartbeat = asyncio.create_task(lease.maintain())
+
+    try:
+        while True:
+            if lease.is_leader:
+                await poll_mentions()
+                await asyncio.sleep(90)  # Wait for 1.5 minutes before checking again
+            else:
+                await asyncio.sleep(lease.ttl / 3)
+    finally:
+        heartbeat.cancel()
+        await lease.release()
+
+
+async def run_worker():
+    """Consume queued mentions, retrying any another worker left unacknowledged."""
+    consumer = consumer_name()
+    print(f"Reply worker {consumer} started.")
+    while True:
+        try:
+            entries = await claim_stale_mentions(
+                redis,
+                consumer,
+                min_idle_ms=int(MENTION_RECLAIM_AFTER * 1000),
+                count=MENTION_CONCURRENCY,
+                max_deliveries=MENTION_MAX_DELIVERIES,
+            ) or await read_new_mentions(redis, consumer, count=MENTION_CONCURRENCY * 2)
+
+            if entries:
+                await process_mentions(entries)
+        except Exception as e:
+            print(f"Error reading mention queue: {e}")
+            traceback.print_exc()
+            await asyncio.sleep(5)
+
+
+async def serve_api():
+    """Serves the FastAPI app (including /metrics) from the worker's event loop."""
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="0.0.0.0", port=int(API_PORT), log_level="warning")
+    )
+    print(f"Serving API and /metrics on port {API_PORT}")
+    await server.serve()
+
+
+async def main(role=AGENT_ROLE):
+    """
+    Main loop: start the AI agent in the given role.
+
+    "poller" fetches mentions into the queue, "worker" replies to queued
+    mentions, and "all" runs both in one process. Only the process holding
+    the poller lease polls, so redundant pollers cost no extra API calls.
+    """
+    print(f"Starting RecluseAI Twitter agent ({role})...")
+
+    await init_redis()
+    await ensure_mention_group(redis)
+
+    # Keep a reference so the server task isn't garbage collected
+    api_task = asyncio.create_task(serve_api()) if API_PORT else None
+
+    loops = []
+    if role in ("poller", "all"):
+        loops.append(run_poller())
+    if role in ("worker", "all"):
+        loops.append(run_worker())
+        loops.append(run_reconciler())
+
+    try:
+        await asyncio.gather(*loops)
     except Exception as e:
         print(f"Unexpected error: {e}")
         traceback.print_exc()
@@ -165,7 +380,11 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Run the RecluseAI Twitter agent.")
+    parser.add_argument("--role", choices=("poller", "worker", "all"), default=AGENT_ROLE)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.role))
 
 # Steps to ai agent
 
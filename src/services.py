@@ -0,0 +1,118 @@
+"""
+Lazily built clients for the external services the agent talks to.
+
+Nothing here is created, or even imported, until first use, so importing a
+module that depends on a service costs nothing and needs no credentials until
+the service is actually called. Each client is then shared for the life of the
+process.
+
+    from src.services import services
+    services.model.ainvoke(...)
+
+Tests and benchmarks can swap any service by assigning to it before first use,
+e.g. `services.model = FakeAgent()`.
+"""
+
+import functools
+
+from src.config import (
+    AGENT_HISTORY_MESSAGES,
+    AGENT_MEMORY_MAX_AGE,
+    AGENT_MEMORY_MAX_THREADS,
+    OPENAI_API_KEY,
+    SUPABASE_KEY,
+    SUPABASE_URL,
+    TWITTER_AUTH_ACCESS_TOKEN,
+    TWITTER_AUTH_ACCESS_TOKEN_SECRET,
+    TWITTER_AUTH_BEARER_TOKEN,
+    TWITTER_AUTH_CONSUMER_KEY,
+    TWITTER_AUTH_CONSUMER_SECRET,
+    TWITTER_MAX_WORKERS,
+)
+
+
+class Services:
+    """Process-wide service container; every attribute is built on first access."""
+
+    @functools.cached_property
+    def supabase(self):
+        from supabase import create_client
+
+        return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+    @functools.cached_property
+    def model(self):
+        from langchain_openai import ChatOpenAI
+
+        from src.agent_personality import MODEL_NAME
+
+        return ChatOpenAI(
+            model_name=MODEL_NAME, openai_api_key=OPENAI_API_KEY, temperature=0.7, stream_usage=True
+        ).with_config({"run_name": "RecluseAI"})
+
+    @functools.cached_property
+    def triage_model(self):
+        from src.utils.agent_helpers import MentionTriage
+
+        return self.model.with_structured_output(MentionTriage, include_raw=True)
+
+    @functools.cached_property
+    def memory(self):
+        from src.utils.memory import BoundedMemorySaver
+
+        # Per-conversation memory, bounded so a long-running worker doesn't grow forever
+        return BoundedMemorySaver(
+            max_threads=AGENT_MEMORY_MAX_THREADS,
+            max_age=AGENT_MEMORY_MAX_AGE,
+            max_messages=AGENT_HISTORY_MESSAGES,
+        )
+
+    @functools.cached_property
+    def agent(self):
+        from langgraph.prebuilt import create_react_agent
+
+        from src.agent_personality import get_system_message
+        from src.utils.memory import windowed_state_modifier
+
+        return create_react_agent(
+            tools=[],
+            model=self.model,
+            checkpointer=self.memory,
+            state_modifier=windowed_state_modifier(
+                get_system_message("conversation"), AGENT_HISTORY_MESSAGES
+            ),
+        )
+
+    @functools.cached_property
+    def twitter(self):
+        """The tweepy v2 Client, with a connection pool sized for the Twitter executor."""
+        from requests.adapters import HTTPAdapter
+        from tweepy import Client
+
+        # wait_on_rate_limit is off: tweepy would sleep for up to 15 minutes inside the
+        # call. Rate limits surface as 429s instead (see twitter_functions.run_twitter).
+        client = Client(
+            bearer_token=TWITTER_AUTH_BEARER_TOKEN,
+            access_token=TWITTER_AUTH_ACCESS_TOKEN,
+            access_token_secret=TWITTER_AUTH_ACCESS_TOKEN_SECRET,
+            consumer_key=TWITTER_AUTH_CONSUMER_KEY,
+            consumer_secret=TWITTER_AUTH_CONSUMER_SECRET,
+            wait_on_rate_limit=False,
+        )
+
+        # Reuse pooled connections across executor threads
+        client.session.mount(
+            "https://",
+            HTTPAdapter(pool_connections=1, pool_maxsize=TWITTER_MAX_WORKERS),
+        )
+        return client
+
+    @functools.cached_property
+    def search(self):
+        """Tavily web search, used by the search_for_info tool."""
+        from langchain_community.tools.tavily_search import TavilySearchResults
+
+        return TavilySearchResults(max_results=2)
+
+
+services = Services()
@@ -1,4 +1,4 @@
-from src.config import supabase
+from src.services import services
 
-response = supabase.table("recluse_mentions").select("*").execute()
+response = services.supabase.table("recluse_mentions").select("*").execute()
 print(response)
\ No newline at end of file
@@ -1,31 +1,66 @@
 from fastapi import FastAPI, HTTPException, Query
-from tweepy import Client
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from langchain_core.tools import Tool
-from src.utils.agent_helpers import provide_summary, provide_search_context, respond_to_conversation
-from src.config import call_openai_with_throttling
+from src.utils.agent_helpers import (
+    call_template,
+    provide_summary,
+    provide_search_context,
+    respond_to_conversation,
+    stream_template,
+)
+from src.config import get_redis
 
 from .config import (
-    TWITTER_AUTH_CONSUMER_KEY,
-    TWITTER_AUTH_CONSUMER_SECRET,
-    TWITTER_AUTH_ACCESS_TOKEN,
-    TWITTER_AUTH_ACCESS_TOKEN_SECRET,
-    TWITTER_AUTH_BEARER_TOKEN,
+    TWITTER_MAX_WORKERS,
+    TWITTER_USERNAME,
+    SEARCH_CACHE_TTL,
+    SUMMARY_TOKEN_BUDGET,
+    SEARCH_MAX_PAGES,
+    PROFILE_CACHE_TTL,
+    TIMELINE_CACHE_TTL,
+    USER_SCAN_MAX_PAGES,
+    HOME_TIMELINE_SIZE,
+    HOME_TIMELINE_REFRESH,
+    TWEET_INDEX_SIZE,
+    TWEET_INDEX_PERSIST,
 )
 
 
 from typing import Union
 from aiolimiter import AsyncLimiter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
 
+import asyncio
 import datetime
+import functools
+import itertools
+import json
 import logging
+import math
 import time
-import openai
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 
 # local imports
-from src.utils.functions import parse_tweet
+from src.utils.functions import estimate_tokens, parse_tweets, select_tweets_for_summary
+from src.utils.rate_limiter import ENDPOINT_LIMITS, acquire, headroom, wait_for_slot
+from src.utils.reply_outbox import begin_reply, complete_reply
+from src.utils.profiles import ProfileCache
+from src.utils.timeline import TimelineSnapshot
+from src.utils.tweet_index import TweetIndex
+from src.utils.cache import get_or_compute, normalize_key
+from src.utils.functions import openai_capacity
+from src.utils.metrics import (
+    openai_headroom,
+    prompt_prefix_tokens,
+    render_metrics,
+    track_stage,
+    twitter_headroom,
+)
+from src.agent_personality import template_token_counts
+from src.services import services
 
 # Logging setup
 logging.basicConfig(level=logging.INFO)
@@ -51,27 +86,7 @@ async def fetch_tweets_tool(count: int = 100, search: str | None = None):
     Fetches the latest tweets from the authenticated user's timeline.
     Optionally filters tweets by a search query.
     """
-    try:
-        async with limiter_fetch_tweets:
-            # Fetch tweets from the timeline
-            response = client.get_home_timeline(max_results=count)
-
-            if not response.data:
-                return {"data": [], "count": 0}
-
-            # Extract tweets
-            tweets = [{"id": tweet.id, "text": tweet.text} for tweet in response.data]
-
-            # Apply search filter if a query is provided
-            if search:
-                search = search.lower()
-                tweets = [tweet for tweet in tweets if search in tweet["text"].lower()]
-
-        return {"data": tweets, "count": len(tweets)}
-
-    except Exception as e:
-        logger.error(f"Error fetching tweets: {e}")
-        raise HTTPException(status_code=500, detail="Error fetching tweets")
+    return await fetch_tweets(count=count, search=search)
 
 
 # Wrap the function as a LangChain tool
@@ -85,17 +100,40 @@ fetch_tweets_tool_wrapper = Tool(
 # Instantiate FastAPI app
 app = FastAPI()
 
-# Configure Tweepy client
-client = Client(
-    bearer_token=TWITTER_AUTH_BEARER_TOKEN,
-    access_token=TWITTER_AUTH_ACCESS_TOKEN,
-    access_token_secret=TWITTER_AUTH_ACCESS_TOKEN_SECRET,
-    consumer_key=TWITTER_AUTH_CONSUMER_KEY,
-    consumer_secret=TWITTER_AUTH_CONSUMER_SECRET,
-    wait_on_rate_limit=True,
+# tweepy is synchronous; its calls run on a dedicated pool so network waits
+# never block the event loop shared by the worker and the API.
+twitter_executor = ThreadPoolExecutor(
+    max_workers=TWITTER_MAX_WORKERS, thread_name_prefix="twitter"
 )
 
 
+async def run_twitter(method, *args, **kwargs):
+    """
+    Runs a blocking tweepy Client method on the Twitter executor.
+
+    Args:
+        method: A bound tweepy Client method, e.g. services.twitter.get_user.
+        *args, **kwargs: Arguments passed through to the method.
+
+    Returns:
+        The tweepy response.
+
+    Raises:
+        HTTPException: 429 if Twitter reports the rate limit as exhausted.
+    """
+    from tweepy import TooManyRequests  # tweepy loads with the first Twitter call
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            twitter_executor, functools.partial(method, *args, **kwargs)
+        )
+    except TooManyRequests as e:
+        reset = e.response.headers.get("x-rate-limit-reset") if e.response is not None else None
+        logger.warning(f"Twitter rate limit hit on {method.__name__}, resets at {reset}")
+        raise HTTPException(status_code=429, detail="Twitter rate limit exceeded. Try again later.")
+
+
 # Rate limiter callback
 def rate_limit_callback(until):
     duration = int(round(until - time.time()))
@@ -106,73 +144,369 @@ def rate_limit_callback(until):
 # rate_limiter_fetch_tweets = RateLimiter(max_calls=15, period=60 * 15, callback=rate_limit_callback)
 
 rate_limiter = AsyncLimiter(max_rate=15, time_period=60 * 15)
-limiter_fetch_tweets = AsyncLimiter(max_rate=15, time_period=60 * 15)
 mentions_rate_limiter = AsyncLimiter(max_rate=15, time_period=60 * 15)
 
 
-RATE_LIMIT_KEY = "twitter_api_calls"
-MAX_CALLS = 15
-TIME_WINDOW = 60 * 15  # 15 minutes
+RATE_LIMIT_MAX_WAIT = 60  # seconds a caller will wait for a rate-limit slot before giving up
+
 
-async def is_rate_limited(redis) -> bool:
+async def is_rate_limited(redis, endpoint: str = "default") -> bool:
     """
-    Checks and updates rate limits using Redis.
+    Checks and updates the endpoint's rate limit using Redis.
     """
-    now = int(time.time())
+    return await acquire(redis, endpoint, TWITTER_USERNAME) > 0
 
-    # Start Redis pipeline to execute commands atomically
-    async with redis.pipeline() as pipe:
-        pipe.lrange(RATE_LIMIT_KEY, 0, -1)  # Fetch timestamps
-        pipe.ltrim(RATE_LIMIT_KEY, -MAX_CALLS, -1)  # Trim old entries
-        results = await pipe.execute()
-    
-    timestamps = [int(ts) for ts in results[0] if now - int(ts) < TIME_WINDOW]
 
-    if len(timestamps) >= MAX_CALLS:
-        return True  # Rate limited
+async def wait_for_rate_limit(redis, endpoint: str, max_wait: float = RATE_LIMIT_MAX_WAIT):
+    """
+    Waits for a slot in the endpoint's budget.
 
-    # Add the new request timestamp and set expiration
-    async with redis.pipeline() as pipe:
-        pipe.rpush(RATE_LIMIT_KEY, now)
-        pipe.expire(RATE_LIMIT_KEY, TIME_WINDOW)  # Prevent infinite growth
-        await pipe.execute()
+    Raises:
+        HTTPException: 429 with a Retry-After header if the next slot is more
+        than max_wait seconds away.
+    """
+    wait = await wait_for_slot(redis, endpoint, TWITTER_USERNAME, max_wait)
+    if wait:
+        logger.warning(f"Rate limit exceeded for {endpoint}. Next slot in {wait:.0f}s.")
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded. Try again later.",
+            headers={"Retry-After": str(int(wait) + 1)},
+        )
 
-    return False
 
-# working tools
-async def read_mentions(username: str, redis):
+async def paginate(redis, endpoint: str, method, max_pages: int, **kwargs):
     """
-    Fetches the latest mentions for RecluseAI.
+    Yields the pages of a paginated tweepy Client method, fetching each only when asked for.
+
+    Like tweepy.Paginator, each page is requested with the previous page's
+    next_token, but calls run on the Twitter executor and each one spends a
+    call of the endpoint's budget. The first page waits for a slot like
+    wait_for_rate_limit; later pages end the scan instead of waiting.
+
+    Args:
+        endpoint (str): The ENDPOINT_LIMITS budget the calls count against.
+        method: A bound tweepy Client method taking pagination_token.
+        max_pages (int): Most pages fetched.
+        **kwargs: Arguments passed to every call.
     """
-    try:
-        if await is_rate_limited(redis):  # ✅ Check Redis-based rate limit
-            logger.warning("Rate limit exceeded for fetching mentions.")
-            raise HTTPException(status_code=429, detail="Rate limit exceeded. Try again later.")
+    pagination_token = None
+    for page in range(max_pages):
+        if not page:
+            await wait_for_rate_limit(redis, endpoint)
+        elif await is_rate_limited(redis, endpoint):
+            logger.warning(f"Rate limit reached for {endpoint} after {page} pages, ending the scan.")
+            return
+
+        response = await run_twitter(method, pagination_token=pagination_token, **kwargs)
+        yield response
+
+        pagination_token = (response.meta or {}).get("next_token")
+        if not pagination_token:
+            return
 
-        now = datetime.datetime.now()
-        logger.info(f"Fetching mentions for: {username} at {now}")
 
-        user = client.get_user(username=username)
+SEARCH_CACHE_KEY = "search_cache:{keyword}"
+MENTIONS_CURSOR_KEY = "mentions_since_id:{username}"
+MENTIONS_BACKFILL_KEY = "mentions_backfill:{username}"  # mentions a truncated catch-up skipped
+USER_ID_KEY = "twitter_user_id:{username}"
+MENTIONS_PAGE_SIZE = 100
+TWEETS_PAGE_SIZE = 100  # user tweets and search results per page (the X API maximum)
+MENTIONS_MAX_PAGES = 5  # pages fetched per poll when catching up after downtime
+AUTHOR_FIELDS = ["created_at", "description", "profile_image_url", "public_metrics", "verified"]
+
+# username -> user id, resolved once per process
+user_id_cache = {}
+
+
+async def get_user_id(username: str, redis) -> str:
+    """
+    Resolves a username to its user ID, caching the result in memory and Redis.
+    """
+    if username in user_id_cache:
+        return user_id_cache[username]
+
+    user_id = await redis.get(USER_ID_KEY.format(username=username))
+    if not user_id:
+        user = await run_twitter(services.twitter.get_user, username=username)
         if not user or not user.data:
             logger.error(f"User {username} not found.")
             raise HTTPException(status_code=404, detail="User not found")
 
-        user_id = user.data["id"]
-        mentions = client.get_users_mentions(id=user_id)
-        
-        if not mentions or not mentions.data:
-            logger.warning(f"No mentions found for user {username}.")
-            raise HTTPException(status_code=404, detail="No mentions found")
-
-        tweets = [
-            {
-                "id": mention.id,
-                **parse_tweet(mention.text),
+        user_id = str(user.data["id"])
+        await redis.set(USER_ID_KEY.format(username=username), user_id)
+
+    user_id_cache[username] = user_id
+    return user_id
+
+
+async def save_mentions_cursor(redis, username: str, newest_id, backfill=None):
+    """
+    Persists the newest processed mention ID so the next poll only fetches newer ones.
+
+    Call this once the mentions returned by read_mentions have been handled, so a
+    crash mid-cycle re-fetches them instead of dropping them. When read_mentions
+    returns a backfill (the catch-up was cut short), the cursor stays put and the
+    backfill is saved instead, so the next polls fetch the skipped mentions first.
+    """
+    if backfill:
+        await redis.set(MENTIONS_BACKFILL_KEY.format(username=username), json.dumps(backfill))
+    elif newest_id:
+        await redis.set(MENTIONS_CURSOR_KEY.format(username=username), str(newest_id))
+        await redis.delete(MENTIONS_BACKFILL_KEY.format(username=username))
+
+
+def author_metadata(user) -> dict:
+    """Flattens a tweepy User into the fields used for local bot scoring and profile lookups."""
+    metrics = user.public_metrics or {}
+    return {
+        "id": str(user.id),
+        "name": user.name,
+        "username": user.username,
+        "description": user.description,
+        "profile_image_url": user.profile_image_url,
+        "verified": user.verified,
+        "created_at": user.created_at.isoformat() if user.created_at else None,
+        "followers_count": metrics.get("followers_count", 0),
+        "following_count": metrics.get("following_count", 0),
+        "tweet_count": metrics.get("tweet_count", 0),
+    }
+
+
+async def fetch_users(field: str, values: list) -> list:
+    """Looks up to 100 users by "username" or "id" in a single users lookup."""
+    lookup = {"usernames": values} if field == "username" else {"ids": values}
+    await wait_for_rate_limit(get_redis(), "users_lookup")
+    response = await run_twitter(services.twitter.get_users, user_fields=AUTHOR_FIELDS, **lookup)
+    return [author_metadata(user) for user in response.data or []]
+
+
+async def fetch_timeline(user_id, count: int) -> list:
+    """Fetches a user's latest tweets."""
+    await wait_for_rate_limit(get_redis(), "user_tweets")
+    response = await run_twitter(
+        services.twitter.get_users_tweets, id=user_id, max_results=min(100, max(5, count))
+    )
+    return [{"id": tweet.id, "text": tweet.text} for tweet in response.data or []]
+
+
+# Every tweet the agent has fetched, searchable by keyword
+tweet_index = TweetIndex(TWEET_INDEX_SIZE)
+tweet_index_loaded = False
+
+
+async def index_tweets(tweets, author_id=None):
+    """Adds fetched tweets to the search index, saving new ones to Redis when TWEET_INDEX_PERSIST is set."""
+    new = tweet_index.add(
+        {"id": tweet["id"], "text": tweet["text"], "author_id": author_id or tweet.get("author_id")}
+        for tweet in tweets
+    )
+    if TWEET_INDEX_PERSIST and new:
+        try:
+            await tweet_index.persist(get_redis(), new)
+        except Exception as e:
+            logger.error(f"Error persisting {len(new)} indexed tweets: {e}")
+
+
+async def search_index(query: str, count: int, author_id=None) -> list:
+    """Searches every indexed tweet, first loading those persisted by earlier runs and other processes."""
+    global tweet_index_loaded
+    if TWEET_INDEX_PERSIST and not tweet_index_loaded:
+        tweet_index_loaded = True
+        try:
+            loaded = await tweet_index.load(get_redis())
+            logger.info(f"Loaded {loaded} persisted tweets into the search index.")
+        except Exception as e:
+            logger.error(f"Error loading the persisted tweet index: {e}")
+    return tweet_index.search(query, count, author_id=author_id)
+
+
+# Profiles and timelines shared by the API and the agent's tools
+profiles = ProfileCache(
+    fetch_users,
+    fetch_timeline,
+    profile_ttl=PROFILE_CACHE_TTL,
+    timeline_ttl=TIMELINE_CACHE_TTL,
+)
+
+
+async def get_user_with_timeline(redis, username: str, count: int):
+    """
+    Returns a user's profile and latest tweets, or (None, []) if the user doesn't exist.
+
+    When the user ID is already known the profile and timeline are fetched
+    concurrently; otherwise the profile lookup resolves the ID first.
+    """
+    user_id = user_id_cache.get(username) or await redis.get(USER_ID_KEY.format(username=username))
+    if user_id:
+        profile, tweets = await asyncio.gather(
+            profiles.get_profile(redis, username=username),
+            profiles.get_timeline(redis, user_id, count),
+        )
+    else:
+        profile = await profiles.get_profile(redis, username=username)
+        if profile is None:
+            return None, []
+
+        await redis.set(USER_ID_KEY.format(username=username), profile["id"])
+        tweets = await profiles.get_timeline(redis, profile["id"], count)
+
+    if profile is not None:
+        await index_tweets(tweets, author_id=profile["id"])
+    return profile, tweets
+
+
+async def scan_user_tweets(redis, user_id, max_pages: int = USER_SCAN_MAX_PAGES):
+    """
+    Yields a user's tweets newest first, fetching older pages only while the caller keeps reading.
+
+    The first page is the cached timeline; older pages continue from its
+    oldest tweet (until_id) and then by next_token. Every page is indexed.
+    """
+    tweets = await profiles.get_timeline(redis, user_id, TWEETS_PAGE_SIZE)
+    await index_tweets(tweets, author_id=user_id)
+    for tweet in tweets:
+        yield tweet
+
+    # A short first page is the user's whole (reachable) timeline
+    if len(tweets) < TWEETS_PAGE_SIZE:
+        return
+
+    pages = paginate(
+        redis,
+        "user_tweets",
+        services.twitter.get_users_tweets,
+        max_pages - 1,
+        id=user_id,
+        until_id=tweets[-1]["id"],
+        max_results=TWEETS_PAGE_SIZE,
+    )
+    async with aclosing(pages):
+        async for response in pages:
+            page = [{"id": tweet.id, "text": tweet.text} for tweet in response.data or []]
+            await index_tweets(page, author_id=user_id)
+            for tweet in page:
+                yield tweet
+
+
+async def scan_search(redis, query: str, max_pages: int = SEARCH_MAX_PAGES):
+    """Yields recent tweets matching a search query, fetching further pages only while the caller keeps reading."""
+    pages = paginate(
+        redis,
+        "search_recent",
+        services.twitter.search_recent_tweets,
+        max_pages,
+        query=query,
+        max_results=TWEETS_PAGE_SIZE,
+        tweet_fields=["public_metrics", "author_id"],
+    )
+    async with aclosing(pages):
+        async for response in pages:
+            page = [
+                {
+                    "id": str(tweet.id),
+                    "text": tweet.text,
+                    "public_metrics": tweet.public_metrics,
+                    "author_id": tweet.author_id,
+                }
+                for tweet in response.data or []
+            ]
+            await index_tweets(page)
+            for tweet in page:
+                yield tweet
+
+
+# working tools
+async def read_mentions(username: str, redis):
+    """
+    Fetches mentions for RecluseAI newer than the stored since_id cursor.
+
+    Follows pagination to catch up after downtime (up to MENTIONS_MAX_PAGES).
+    Pages run newest first, so a catch-up cut short by the page cap or the rate
+    limit leaves a gap above the cursor. It is returned as a backfill
+    (since_id, until_id and the newest_id to move the cursor to afterwards),
+    and later polls page through the gap before fetching anything newer.
+
+    The returned newest_id and backfill should be passed to
+    save_mentions_cursor once the mentions have been processed.
+    """
+    try:
+        now = datetime.datetime.now()
+        user_id = await get_user_id(username, redis)
+        since_id = await redis.get(MENTIONS_CURSOR_KEY.format(username=username))
+        backfill = await redis.get(MENTIONS_BACKFILL_KEY.format(username=username))
+        backfill = json.loads(backfill) if backfill else None
+
+        if backfill:
+            since_id, until_id = backfill["since_id"], backfill["until_id"]
+            logger.info(f"Backfilling mentions for: {username} between {since_id} and {until_id} at {now}")
+        else:
+            until_id = None
+            logger.info(f"Fetching mentions for: {username} since {since_id} at {now}")
+
+        tweets = []
+        newest_id = backfill["newest_id"] if backfill else None
+        oldest_id = None
+        next_token = None
+
+        # Without a cursor there is no backlog to catch up on; one page is enough.
+        async for mentions in paginate(
+            redis,
+            "mentions",
+            services.twitter.get_users_mentions,
+            MENTIONS_MAX_PAGES if since_id else 1,
+            id=user_id,
+            since_id=since_id,
+            until_id=until_id,
+            max_results=MENTIONS_PAGE_SIZE,
+            tweet_fields=["conversation_id", "author_id"],
+            expansions=["author_id"],
+            user_fields=AUTHOR_FIELDS,
+        ):
+            meta = mentions.meta or {}
+            newest_id = newest_id or meta.get("newest_id")
+            oldest_id = meta.get("oldest_id") or oldest_id
+            next_token = meta.get("next_token")
+            authors = {
+                user.id: author_metadata(user)
+                for user in (mentions.includes or {}).get("users", [])
             }
-            for mention in mentions.data
-        ]
+            page_mentions = mentions.data or []
+            tweets.extend(
+                {
+                    "id": mention.id,
+                    "conversation_id": mention.conversation_id,
+                    "author": authors.get(mention.author_id),
+                    **parsed,
+                }
+                for mention, parsed in zip(
+                    page_mentions, parse_tweets(mention.text for mention in page_mentions)
+                )
+            )
 
-        return {"status": "success", "mentions_tweet": tweets}
+            await index_tweets(
+                {"id": mention.id, "text": mention.text, "author_id": mention.author_id}
+                for mention in page_mentions
+            )
+
+        if not tweets:
+            logger.info(f"No new mentions for user {username}.")
+
+        # Pages were left unread between the cursor and the oldest mention fetched
+        backfill = None
+        if since_id and next_token and oldest_id:
+            backfill = {"since_id": since_id, "until_id": oldest_id, "newest_id": newest_id}
+            logger.warning(
+                f"Mention catch-up cut short; mentions between {since_id} and {oldest_id} "
+                "will be fetched on the next polls."
+            )
+
+        return {
+            "status": "success",
+            "mentions_tweet": tweets,
+            "newest_id": newest_id,
+            "backfill": backfill,
+        }
 
     except HTTPException as http_err:
         raise http_err  # Properly handle HTTP exceptions
@@ -184,23 +518,48 @@ async def read_mentions(username: str, redis):
 async def reply_to_tweet(redis, message, tweet_id):
     """
     Replies to a tweet with the given message while enforcing rate limits.
+
+    The reply goes through the outbox (see utils/reply_outbox.py): a tweet that
+    was already answered is not answered again, and a retried reply resends
+    the originally recorded message.
     """
+    from tweepy import Forbidden  # loaded with the tweepy client
+
     try:
         if len(message) > 280:
             raise ValueError("Message exceeds Twitter's character limit (280 characters).")
-        
-        # Check rate limits
-        if await is_rate_limited(redis):
-            raise HTTPException(status_code=429, detail="Rate limit exceeded. Please try again later.")
 
-        # Simulated API call for reply
-        response = client.create_tweet(text=message, in_reply_to_tweet_id=tweet_id)
+        record = await begin_reply(redis, tweet_id, message)
+        if record["state"] == "sent":
+            logger.info(f"Tweet ID {tweet_id} was already replied to, skipping.")
+            return {
+                "status": "success",
+                "reply_id": record.get("reply_id") or None,
+                "message": "Reply already sent.",
+            }
+        message = record["message"]
 
+        # Check rate limits
+        await wait_for_rate_limit(redis, "create_tweet")
+
+        try:
+            response = await run_twitter(
+                services.twitter.create_tweet, text=message, in_reply_to_tweet_id=tweet_id
+            )
+            reply_id = response.data["id"]
+        except Forbidden as e:
+            # An earlier attempt got through before its outbox update did.
+            if "duplicate" not in str(e).lower():
+                raise
+            logger.info(f"Reply to tweet ID {tweet_id} was already posted.")
+            reply_id = None
+
+        await complete_reply(redis, tweet_id, reply_id)
         logger.info(f"Reply sent successfully to tweet ID {tweet_id}: {message}")
-        
+
         return {
             "status": "success",
-            # "reply_id": response["id"],
+            "reply_id": reply_id,
             "message": "Reply sent successfully!"
         }
 
@@ -208,55 +567,135 @@ async def reply_to_tweet(redis, message, tweet_id):
         logger.warning(f"Validation error: {ve}")
         raise HTTPException(status_code=400, detail=str(ve))
 
+    except HTTPException as http_err:
+        raise http_err
+
     except Exception as e:
         logger.error(f"Error replying to tweet: {e}")
         raise HTTPException(status_code=500, detail="Error replying to tweet")
 
-async def search_for_tweets(redis, keyword: str, count: int = 5):
+SEARCH_CANDIDATE_FACTOR = 2  # tweet tokens searched for, as a multiple of SUMMARY_TOKEN_BUDGET
+
+
+async def summarize_search(redis, search_context: str):
+    """
+    Searches recent tweets for a keyword and summarizes them in one LLM call.
+
+    Result pages are fetched (up to SEARCH_MAX_PAGES) until they hold enough
+    text to fill the budget. Retweets and near-duplicates are dropped and the
+    remaining tweets are packed into SUMMARY_TOKEN_BUDGET before a single
+    provide_summary call.
+
+    Returns:
+        dict: The fetched tweets as {"id", "text"}, the summary (None when the
+        search found nothing), and how many tweets/estimated tokens went into it.
+    """
+    logger.info(f"Searching for tweets containing '{search_context}'")
+
+    # Page through results only until there is enough text to fill the
+    # summary budget, with room for the near-duplicates selection drops
+    tweets = []
+    candidate_tokens = 0
+    with track_stage("twitter_search"):
+        results = scan_search(redis, f"{search_context} -is:retweet")
+        async with aclosing(results):
+            async for tweet in results:
+                tweets.append(tweet)
+                candidate_tokens += estimate_tokens(tweet["text"])
+                if candidate_tokens >= SUMMARY_TOKEN_BUDGET * SEARCH_CANDIDATE_FACTOR:
+                    break
+
+    selected, summary_tokens = select_tweets_for_summary(tweets, SUMMARY_TOKEN_BUDGET)
+    logger.info(
+        f"Summarizing {len(selected)} of {len(tweets)} tweets (~{summary_tokens} tokens)"
+    )
+
+    summary = None
+    if selected:
+        with track_stage("summarization"):
+            summary = await provide_summary("\n".join(tweet["text"] for tweet in selected))
+        print("AI response summary:", summary)
+
+    return {
+        "tweets": tweets,
+        "summary": summary,
+        "tweets_used": len(selected),
+        "summary_tokens": summary_tokens,
+    }
+
+
+async def search_for_tweets(redis, keyword: str, count: int = 5, search_query: str | None = None):
     """
     Scans a user's tweets for relevance based on a keyword.
+
+    When the caller already knows the search keyword (e.g. from mention triage),
+    pass it as search_query to skip the extra search-context LLM call.
+
+    Results are cached in Redis per normalized keyword for SEARCH_CACHE_TTL
+    seconds, and concurrent requests for the same keyword share one search.
     """
     try:
-          # Check rate limits
-        if await is_rate_limited(redis):
-            raise HTTPException(status_code=429, detail="Rate limit exceeded. Please try again later.")
-        
-        search_context = await provide_search_context(search_query=keyword)
-        
+        search_context = search_query or await provide_search_context(search_query=keyword)
+
         print(f"search context: {search_context}")
 
-        response = client.search_recent_tweets(query=search_context, max_results=100)
-        logger.info(f"Searching for tweets containing '{keyword}'")
+        result = await get_or_compute(
+            redis,
+            SEARCH_CACHE_KEY.format(keyword=normalize_key(search_context)),
+            SEARCH_CACHE_TTL,
+            lambda: summarize_search(redis, search_context),
+        )
 
-        # print('current response from search: ', response)
-        
-        
-        if(response.data == None) or (len(response.data) == 0):
-            response = respond_to_conversation(tweet)
-            print("actual tweet:", tweet)
+        if not result["tweets"]:
+            response = await respond_to_conversation(keyword)
+            print("actual tweet:", keyword)
             print("AI response call:", response)
-             
-        concat_tweet = ''
-        if len(response.data) > 0:
-            for tweet in response.data:
-                concat_tweet = concat_tweet + tweet.text
-                response = await provide_summary(concat_tweet)
-                print("AI response summary:", response)
-            
-                    
+            return {"status": "success", "response": response}
+
         # print(f"response within search for tweets context:", response)
-        return {"status": "success", "response": response}
-    
+        return {
+            "status": "success",
+            "response": result["summary"],
+            "tweets_used": result["tweets_used"],
+            "summary_tokens": result["summary_tokens"],
+        }
+
     except ValueError as ve:
         logger.warning(f"Validation error: {ve}")
         raise HTTPException(status_code=400, detail=str(ve))
-    
+
+    except HTTPException as http_err:
+        raise http_err
+
     except Exception as e:
         logger.error(f"Error fetching relevant tweets: {e}")
         raise HTTPException(status_code=500, detail="Error fetching relevant tweets")
 
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Exposes per-stage latency, mention counters and rate-limit headroom in the Prometheus text format.
+    """
+    for template, tokens in template_token_counts().items():
+        prompt_prefix_tokens.set(tokens, template=template)
+
+    try:
+        redis = get_redis()
+        for endpoint in ENDPOINT_LIMITS:
+            twitter_headroom.set(
+                await headroom(redis, endpoint, TWITTER_USERNAME), endpoint=endpoint
+            )
+        for resource, available in (await openai_capacity(redis)).items():
+            openai_headroom.set(available, resource=resource)
+    except Exception as e:
+        # Still serve the in-process metrics if Redis is unavailable.
+        logger.error(f"Error reading rate-limit headroom: {e}")
+
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 #   WIP twitter tweet functions
 
 @app.post("/retweet")
@@ -266,7 +705,7 @@ async def retweet_tweet(tweet_id: int):
     """
     try:
         async with rate_limiter:
-            response = client.retweet(tweet_id=tweet_id)
+            response = await run_twitter(services.twitter.retweet, tweet_id=tweet_id)
 
         return {
             "status": "success",
@@ -277,47 +716,75 @@ async def retweet_tweet(tweet_id: int):
         logger.error(f"Error retweeting tweet: {e}")
         raise HTTPException(status_code=500, detail="Error retweeting tweet")
 
+async def fetch_home_timeline(since_id=None):
+    """
+    Fetches home timeline tweets newer than since_id, newest first.
+
+    Pages back towards since_id, up to enough pages to fill the snapshot and
+    only while the endpoint has budget: later pages never wait for a slot.
+
+    Returns:
+        tuple: (tweets, complete), where complete is False if tweets newer than
+        since_id were left unfetched. None if the endpoint has no budget left.
+    """
+    redis = get_redis()
+    tweets, pagination_token = [], None
+    for page in range(math.ceil(HOME_TIMELINE_SIZE / TWEETS_PAGE_SIZE)):
+        if await acquire(redis, "home_timeline", TWITTER_USERNAME):
+            if not page:
+                logger.info("Home timeline budget exhausted, serving the cached snapshot.")
+                return None
+            break
+
+        response = await run_twitter(
+            services.twitter.get_home_timeline,
+            max_results=TWEETS_PAGE_SIZE,
+            since_id=since_id,
+            pagination_token=pagination_token,
+            tweet_fields=["author_id"],
+        )
+        tweets.extend(
+            {"id": tweet.id, "text": tweet.text, "author_id": tweet.author_id}
+            for tweet in response.data or []
+        )
+        pagination_token = (response.meta or {}).get("next_token")
+        if not pagination_token:
+            break
+
+    await index_tweets(tweets)
+    return tweets, not pagination_token
+
+
+# One snapshot serves every home timeline read, so reads don't spend API calls
+home_timeline = TimelineSnapshot(
+    fetch_home_timeline, max_size=HOME_TIMELINE_SIZE, refresh_interval=HOME_TIMELINE_REFRESH
+)
+
+
 @app.get("/fetch_10_recent_tweets")
 async def fetch_10_recent_tweets(count: int = 10):
     """
     Fetches the latest tweets from the authenticated user's timeline.
     """
-    try:
-        async with limiter_fetch_tweets:
-            response = client.get_home_timeline(max_results=count)
-            if response.data:
-                tweets = [
-                    {"id": tweet.id, "text": tweet.text} for tweet in response.data
-                ]
-            else:
-                tweets = []
-        return {"data": tweets, "count": len(tweets)}
-    except Exception as e:
-        logger.error(f"Error fetching tweets: {e}")
-        raise HTTPException(status_code=500, detail="Error fetching tweets")
+    return await fetch_tweets(count=count, search=None)
 
 @app.get("/fetch_tweets")
 async def fetch_tweets(count: int = 100, search: str = Query(default=None)):
     """
     Fetches the latest tweets from the authenticated user's timeline.
-    Optionally filters tweets by a search query.
+    With a search query, returns only the newest matching ones (see TweetIndex
+    for the query syntax).
     """
     try:
-        async with limiter_fetch_tweets:
-            # Fetch tweets from the timeline
-            response = client.get_home_timeline(max_results=count)
-
-            if not response.data:
-                return {"data": [], "count": 0}
-
-            # Extract tweets
-            tweets = [{"id": tweet.id, "text": tweet.text} for tweet in response.data]
-
-            # Apply search filter if a query is provided
-            if search:
-                search = search.lower()
-                tweets = [tweet for tweet in tweets if search in tweet["text"].lower()]
-
+        if search:
+            if home_timeline.is_stale():
+                await home_timeline.refresh()
+            # Timeline tweets are indexed as they are fetched, so the index
+            # only has to test the snapshot's own tweets, newest first.
+            matches = tweet_index.matcher(search)
+            tweets = list(itertools.islice(filter(matches, home_timeline.tweets), count))
+        else:
+            tweets = await home_timeline.read(count)
         return {"data": tweets, "count": len(tweets)}
     except Exception as e:
         logger.error(f"Error fetching tweets: {e}")
@@ -336,24 +803,22 @@ async def find_user(username: str = None, user_id: int = None):
                 status_code=400, detail="Provide either a username or user_id."
             )
 
-        async with rate_limiter:
-            if username:
-                user = client.get_user(username=username)
-            elif user_id:
-                user = client.get_user(user_id=user_id)
+        user = await profiles.get_profile(get_redis(), username=username, user_id=user_id)
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
 
         return {
             "status": "success",
             "data": {
-                "id": user.data["id"],
-                "name": user.data["name"],
-                "username": user.data["username"],
-                "description": user.data.get("description", ""),
-                "followers": user.data.get("public_metrics", {}).get(
-                    "followers_count", 0
-                ),
+                "id": user["id"],
+                "name": user["name"],
+                "username": user["username"],
+                "description": user.get("description") or "",
+                "followers": user["followers_count"],
             },
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error finding user: {e}")
         raise HTTPException(status_code=500, detail="Error finding user")
@@ -389,66 +854,112 @@ async def find_user(username: str = None, user_id: int = None):
 #         raise HTTPException(status_code=500, detail="Error analyzing user")
 
 
+async def take(tweets, count: int, matches=None) -> list:
+    """Collects up to `count` tweets (optionally only matching ones) from a scan, then stops it."""
+    taken = []
+    async with aclosing(tweets):
+        async for tweet in tweets:
+            if matches is None or matches(tweet):
+                taken.append(tweet)
+                if len(taken) >= count:
+                    break
+    return taken
+
+
+async def relevant_tweets(redis, user_id, keyword: str, count: int):
+    """
+    Yields up to `count` of a user's tweets matching the keyword query, newest first.
+
+    The user's tweets are scanned page by page until enough match; if the scan
+    runs out of pages or budget first, older matches already in the tweet
+    index (from earlier scans, mentions and searches) make up the rest.
+    """
+    matches = tweet_index.matcher(keyword)
+    found = 0
+    oldest_scanned = None
+
+    tweets = scan_user_tweets(redis, user_id)
+    async with aclosing(tweets):
+        async for tweet in tweets:
+            oldest_scanned = int(tweet["id"])
+            if matches(tweet):
+                yield tweet
+                found += 1
+                if found >= count:
+                    return
+
+    for tweet in await search_index(keyword, count, author_id=user_id):
+        if found >= count:
+            return
+        if oldest_scanned is None or int(tweet["id"]) < oldest_scanned:
+            yield tweet
+            found += 1
+
+
+async def ndjson(items):
+    """Streams an async iterable of dicts as newline-delimited JSON."""
+    async for item in items:
+        yield json.dumps(item, default=str) + "\n"
+
+
 @app.get("/latest_tweets")
 async def scan_latest_tweets(username: str, count: int = 5):
     """
-    Scans a user's latest tweets.
+    Scans a user's latest tweets, paging back as far as `count` needs
+    (up to USER_SCAN_MAX_PAGES pages and the user_tweets budget).
     """
     try:
-        async with rate_limiter:
-            user = client.get_user(username=username)
-            user_id = user.data["id"]
-            tweets = client.get_users_tweets(id=user_id, max_results=count)
-
-        tweet_data = [{"id": tweet.id, "text": tweet.text} for tweet in tweets.data]
+        redis = get_redis()
+        user = await profiles.get_profile(redis, username=username)
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
 
-        return {"status": "success", "tweets": tweet_data}
+        tweets = await take(scan_user_tweets(redis, user["id"]), count)
+        return {"status": "success", "tweets": tweets}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching latest tweets: {e}")
         raise HTTPException(status_code=500, detail="Error fetching latest tweets")
 
 
 @app.get("/relevant_tweets")
-async def scan_relevant_tweets(username: str, keyword: str, count: int = 5):
+async def scan_relevant_tweets(username: str, keyword: str, count: int = 5, stream: bool = False):
     """
-    Scans a user's tweets for relevance based on a keyword.
+    Scans a user's tweets for relevance based on a keyword query (see TweetIndex
+    for the syntax), stopping as soon as `count` match.
+
+    With stream=true each match is sent as a line of JSON as soon as it's found.
     """
     try:
-        async with rate_limiter:
-            user = client.get_user(username=username)
-            user_id = user.data["id"]
-            tweets = client.get_users_tweets(id=user_id, max_results=100)
-
-        # Filter tweets based on the keyword
-        relevant_tweets = [
-            {"id": tweet.id, "text": tweet.text}
-            for tweet in tweets.data
-            if keyword.lower() in tweet.text.lower()
-        ][:count]
-
-        return {"status": "success", "relevant_tweets": relevant_tweets}
+        redis = get_redis()
+        user = await profiles.get_profile(redis, username=username)
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        matches = relevant_tweets(redis, user["id"], keyword, count)
+        if stream:
+            return StreamingResponse(ndjson(matches), media_type="application/x-ndjson")
+
+        return {"status": "success", "relevant_tweets": await take(matches, count)}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching relevant tweets: {e}")
         raise HTTPException(status_code=500, detail="Error fetching relevant tweets")
 
 
-
 @app.post("/analyze")
-def analyze_crypto_sentiment(tweet_text: str):
-    prompt = f"""
-    Analyze the sentiment of the following tweet specifically in the context of cryptocurrency. 
-    Classify the sentiment as one of the following:
-    - 'bullish' if the tweet shows optimism, excitement, or positive expectations about cryptocurrency prices or trends.
-    - 'bearish' if the tweet expresses pessimism, concerns, or negative expectations about cryptocurrency prices or trends.
-    - 'neutral' if the tweet does not clearly express bullish or bearish sentiment.
-
-    Provide the classification and a brief explanation of your reasoning.
+async def analyze_crypto_sentiment(tweet_text: str, stream: bool = False):
+    """
+    Classifies a tweet as bullish, bearish or neutral, with a short explanation.
 
-    Tweet: "{tweet_text}"
+    With stream=true the explanation is streamed back as plain text while the
+    model is still writing it.
     """
-    response = openai.ChatCompletion.create(
-        model="gpt-4",
-        messages=[{"role": "user", "content": prompt}],
-    )
-    result = response["choices"][0]["message"]["content"].strip()
-    return result
+    content = f'Tweet: "{tweet_text}"'
+    if stream:
+        return StreamingResponse(stream_template("sentiment", content), media_type="text/plain")
+
+    response = await call_template("sentiment", content)
+    return response.content.strip()
@@ -1,87 +1,170 @@
 # src/ai_helpers.py
 
-from langchain_core.messages import HumanMessage
-from src.agent_personality import get_system_message
-from src.config import agent_executor, config  # If agent_executor is in main.py
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+from src.agent_personality import PROMPT_TEMPLATES
+from src.config import (
+    openai_retry,
+    thread_config,
+    throttled_call,
+    throttled_stream,
+    tokens_used,
+)
+from src.services import services
+from src.utils.functions import estimate_tokens
+from src.utils.metrics import prompt_tokens_total
+
+
+class MentionTriage(BaseModel):
+    """Structured verdict for a single mention, produced by one LLM call."""
+
+    is_bot: bool = Field(
+        description="True if the account looks like a bot or spam. Accounts asking a genuine question are not bots."
+    )
+    intent: Literal["conversation", "twitter"] = Field(
+        description="'twitter' if the user asks for something that can be found by searching twitter, else 'conversation'."
+    )
+    keyword: Optional[str] = Field(
+        default=None,
+        description="A single keyword to search twitter with when intent is 'twitter'.",
+    )
 
 
-async def provide_summary(concat: str):
-    prompt = f"""
-    Summarize this news in a short, crypto-native style tweet. Keep it sharp, direct, and opinionated. Use tickers, numbers, and key players. Avoid unnecessary words. Imagine you're a degenerate trader dropping alpha on Twitter.
-    Most importantly provide insights to what is going no today on the subject.
-    Again, don't use any hashtags. Emojis are fine. but sparingly.
-    Most importantly tell me what has changed on the subject matter.
-    {concat}
+@openai_retry
+async def call_template(name: str, content: str, runnable=None, behavior: str = None):
     """
-    response = agent_executor.invoke(
-        {"messages": [HumanMessage(content=prompt)]}, config=config
-    )
-    print("response from provide summary: ", response["messages"][-1].content)
-    return response["messages"][-1].content
+    Runs one call of a registered prompt template through the OpenAI throttle,
+    retrying transient errors (see openai_retry).
 
+    Args:
+        name (str): The PROMPT_TEMPLATES entry to use.
+        content (str): The variable part of the prompt, placed last.
+        runnable: What to invoke with the messages. Defaults to the chat model.
+        behavior (str): Overrides the template's behavior/system message.
 
-async def provide_search_context(search_query: str):
-    prompt = f"""
-    You are about to make search on twitter for relevant posts on {search_query}.
-    Provide a 1 word keyword only, and no other text, to fetch relevant posts on the subject matter.
+    Returns:
+        The runnable's response. Tokens used are recorded per template.
     """
+    messages = PROMPT_TEMPLATES[name].messages(content, behavior)
+    prompt = "\n".join(message.content for message in messages)
 
-    # Clone config and override state_modifier
-    custom_config = {
-        **config,
-        "system_message": "You are a neutral search assistant. Ignore all previous context.",
-        "state_modifier": get_system_message("urgent"),
-    }
+    response = await throttled_call(prompt, (runnable or services.model).ainvoke, messages)
+    prompt_tokens_total.inc(tokens_used(response, estimate_tokens(prompt)), template=name)
+    return response
+
+
+async def stream_template(name: str, content: str, behavior: str = None):
+    """
+    Streams one call of a registered prompt template, yielding text as it arrives.
+
+    For callers that can act on partial output (e.g. an HTTP response); the
+    arguments are those of call_template. Tokens used are recorded per
+    template once the stream ends.
+    """
+    messages = PROMPT_TEMPLATES[name].messages(content, behavior)
+    prompt = "\n".join(message.content for message in messages)
+
+    response = None
+    try:
+        async for chunk in throttled_stream(prompt, services.model.astream, messages):
+            response = chunk if response is None else response + chunk
+            if chunk.content:
+                yield chunk.content
+    finally:
+        prompt_tokens_total.inc(tokens_used(response, estimate_tokens(prompt)), template=name)
+
+
+async def provide_summary(concat: str):
+    response = await call_template("summary", concat)
+    print("response from provide summary: ", response.content)
+    return response.content
 
-    response = agent_executor.invoke(
-        {"messages": [HumanMessage(content=prompt)]},
-        config=custom_config,
-    )
+
+async def provide_search_context(search_query: str):
+    response = await call_template("search_context", f"Subject: {search_query}")
 
     # print("response from provide search context: ", response)
-    return response["messages"][-1].content
+    return response.content
 
 
-async def provide_conversation_context(tweet: str, state="default"):
-    prompt = f"""
-    identify if the user is being conversational in this tweet: {tweet}, or they are asking you to search for something on twitter. Return keyword 'twitter' only without the quotations if a you are asked a question you can find on twitter with a one word keyword, else return 'conversational' keyword without the quotations.
+async def triage_mention(tweet: str, check_bot: bool = True) -> Optional[MentionTriage]:
     """
+    Classify a mention in a single structured call.
 
-    # Clone config and override state_modifier
-    custom_config = {
-        **config,
-        "system_message": "Ignore all previous context. You are to understand the tone of a conversation and return the appropriate keyword.",
-        "state_modifier": get_system_message(state),
-    }
+    Replaces the separate bot check and conversation-context calls: bot status,
+    intent and the search keyword come back together and are validated against
+    MentionTriage.
 
-    response = agent_executor.invoke(
-        {"messages": [HumanMessage(content=prompt)]},
-        config=custom_config,
-    )
+    Args:
+        tweet (str): The mention text.
+        check_bot (bool): False when the author is already known to be human,
+            so the model only classifies intent.
+
+    Returns:
+        MentionTriage: The triage verdict, or None if the call failed or its
+        output could not be parsed. Nothing is known about the author then, so
+        callers should not cache a bot verdict from it.
+    """
+    bot_hint = "" if check_bot else "The account is a known human, so is_bot is false.\n"
+    try:
+        result = await call_template(
+            "triage", f"{bot_hint}Tweet: {tweet}", services.triage_model
+        )
+        triage = result["parsed"]
+        if triage is None:
+            raise ValueError(result["parsing_error"])
+        if not check_bot:
+            triage.is_bot = False
+        if triage.intent == "twitter" and not triage.keyword:
+            triage.intent = "conversation"
+        return triage
+    except Exception as e:
+        print(f"Error triaging tweet: {e}")
+        return None
+
+
+async def provide_conversation_context(tweet: str, state="default"):
+    response = await call_template("conversation_context", f"Tweet: {tweet}", behavior=state)
 
     # print("response from provide search context: ", response)
-    return response["messages"][-1].content
+    return response.content
+
+
+@openai_retry
+async def call_agent(prompt: str, message, conversation_id):
+    """Runs one agent turn in a conversation's memory thread through the OpenAI throttle, retrying transient errors."""
+    response = await throttled_call(
+        prompt,
+        services.agent.ainvoke,
+        {"messages": [message]},
+        config=thread_config(conversation_id),
+    )
+    prompt_tokens_total.inc(
+        tokens_used(response, estimate_tokens(prompt)), template="conversation"
+    )
+    return response
 
 
 async def respond_to_conversation(
     tweet: str,
+    conversation_id=None,
 ):
-    prompt = f"""
-    You have a conversational, witty personality, you can roast and be sarcastic with people as you like, but most of the time one line respones are enough.
-    If they ask you about yourself and what you can do, you can reply honestly.
-    {tweet}
     """
+    Replies to a conversational tweet.
 
-    # Clone config and override state_modifier
-    custom_config = {
-        **config,
-        "system_message": "Ignore all previous context. You are to understand the tone of a conversation",
-        "state_modifier": get_system_message("conversation"),
-    }
-    response = agent_executor.invoke(
-        {"messages": [HumanMessage(content=prompt)]},
-        config=custom_config,
-        checkpointer=None,
-    )
-    print("response from provide summary: ", response["messages"][-1].content)
+    With a conversation_id the agent remembers earlier turns of that Twitter
+    conversation (windowed to AGENT_HISTORY_MESSAGES); without one the reply
+    is stateless.
+    """
+    if not conversation_id:
+        response = await call_template("conversation", tweet)
+        print("response from respond to conversation: ", response.content)
+        return response.content
+
+    # The agent supplies the conversation system message and the thread's history.
+    system_message, message = PROMPT_TEMPLATES["conversation"].messages(tweet)
+    prompt = f"{system_message.content}\n{message.content}"
+    response = await call_agent(prompt, message, conversation_id)
+    print("response from respond to conversation: ", response["messages"][-1].content)
     return response["messages"][-1].content
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import re
+import time
+import uuid
+from collections import OrderedDict
+
+CACHE_LOCK_TIMEOUT = 60  # seconds before a crashed computation's lock expires
+CACHE_POLL_INTERVAL = 0.25  # seconds between checks while another process computes
+
+# Compare-and-delete so a process only ever releases its own lock
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# key -> future for computations running in this process
+inflight = {}
+
+
+class LRUCache:
+    """
+    Size-bounded in-process cache with a TTL per entry.
+
+    Sits in front of Redis for hot keys: the least recently used entry is
+    evicted beyond max_size, and expired entries are dropped when read.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Returns the cached value, or None if missing or expired."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl: float):
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+
+def normalize_key(text: str) -> str:
+    """
+    Normalizes free text into a cache key component.
+
+    Lowercases, drops surrounding quotes/punctuation and collapses whitespace,
+    so "BTC", " btc " and '"btc".' share an entry.
+    """
+    text = re.sub(r"\s+", " ", text.lower()).strip()
+    return text.strip("\"'.,!?;:")
+
+
+async def get_or_compute(redis, key: str, ttl: int, compute):
+    """
+    Returns the JSON value cached under key, computing and caching it on a miss.
+
+    Concurrent misses for the same key share a single computation: callers in
+    this process await the same future, and other processes wait on a Redis
+    lock until the value lands in the cache.
+
+    Args:
+        redis: The async Redis client.
+        key (str): The cache key.
+        ttl (int): Seconds the computed value stays fresh.
+        compute: A zero-argument coroutine function producing a JSON-serializable value.
+    """
+    cached = await redis.get(key)
+    if cached is not None:
+        return json.loads(cached)
+
+    if key in inflight:
+        return await asyncio.shield(inflight[key])
+
+    future = asyncio.get_running_loop().create_future()
+    inflight[key] = future
+    try:
+        value = await compute_with_lock(redis, key, ttl, compute)
+        future.set_result(value)
+        return value
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved when nobody else is waiting
+        raise
+    finally:
+        inflight.pop(key, None)
+
+
+async def compute_with_lock(redis, key: str, ttl: int, compute):
+    """Computes a value under a cross-process Redis lock, or waits for the holder's result."""
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+
+    while True:
+        if await redis.set(lock_key, token, nx=True, ex=CACHE_LOCK_TIMEOUT):
+            try:
+                value = await compute()
+                await redis.set(key, json.dumps(value), ex=ttl)
+                return value
+            finally:
+                await redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+        # Another process holds the lock; pick up its result once it lands.
+        await asyncio.sleep(CACHE_POLL_INTERVAL)
+        cached = await redis.get(key)
+        if cached is not None:
+            return json.loads(cached)
@@ -1,9 +1,9 @@
-from src.config import supabase
+from src.services import services
 
 # Insert a Tweet mention
 def insert_mention(tweet_id: int, replied_status: bool = False):
     data = {"id": tweet_id, "replied_status": replied_status}
-    response = supabase.table("recluse_mentions").insert(data).execute()
+    response = services.supabase.table("recluse_mentions").insert(data).execute()
     print(response)
 
 # Example Usage
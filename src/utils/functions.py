@@ -1,8 +1,9 @@
 import re
-from typing import Dict, List
+import functools
+from typing import Dict, Iterable, List
 import emoji
 import json
-from datetime import time
+from datetime import datetime, timezone
 import time
 import asyncio
 from redis.asyncio import Redis
@@ -11,66 +12,334 @@ OPENAI_RPM_LIMIT = 20  # Example limit, adjust
 OPENAI_TPM_LIMIT = 150000  # Example token limit
 WINDOW_SECONDS = 60  # 1 minute time window
 
-async def can_make_request(redis):
-    """Check if we are within OpenAI's rate limits."""
-    current_time = int(time.time())
-    minute_key = f"openai_usage:{current_time // WINDOW_SECONDS}"
+OPENAI_BUCKET_KEY = "openai_bucket"
+OPENAI_SCALE_KEY = "openai_bucket:scale"
+RATE_LIMIT_BACKOFF = 0.5  # rate multiplier applied on every 429
+MIN_RATE_SCALE = 0.1  # never throttle below 10% of the configured limits
+RATE_RECOVERY_PER_SECOND = 0.01  # scale regained per second after a 429 (~1 min to recover from 0.5)
 
-    # Get current counts
-    requests_count = await redis.get(f"{minute_key}:requests") or 0
-    tokens_count = await redis.get(f"{minute_key}:tokens") or 0
+# Token bucket shared across processes. Both the request and token buckets
+# refill continuously at limit/WINDOW_SECONDS, scaled down after 429s, and
+# capacity is taken from both at once or not at all.
+#
+# KEYS[1] = bucket hash, KEYS[2] = scale hash
+# ARGV = now, rpm, tpm, tokens, window, recovery_per_second
+# Returns the seconds to wait before retrying, or 0 if capacity was taken.
+TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[5])
 
-    requests_count = int(requests_count)
-    tokens_count = int(tokens_count)
+local scale_data = redis.call('HMGET', KEYS[2], 'scale', 'ts')
+local scale = tonumber(scale_data[1]) or 1
+local scale_ts = tonumber(scale_data[2]) or now
+scale = math.min(1, scale + (now - scale_ts) * tonumber(ARGV[6]))
 
-    # Check limits
-    if requests_count >= OPENAI_RPM_LIMIT:
-        print("Rate limit reached: Too many requests per minute")
-        return False
-    if tokens_count >= OPENAI_TPM_LIMIT:
-        print("Rate limit reached: Too many tokens per minute")
-        return False
+local rpm = tonumber(ARGV[2]) * scale
+local tpm = tonumber(ARGV[3]) * scale
+local cost = math.min(tonumber(ARGV[4]), tpm)
 
-    return True
+local data = redis.call('HMGET', KEYS[1], 'requests', 'tokens', 'ts')
+local last = tonumber(data[3]) or now
+local requests = math.min(rpm, (tonumber(data[1]) or rpm) + (now - last) * rpm / window)
+local tokens = math.min(tpm, (tonumber(data[2]) or tpm) + (now - last) * tpm / window)
 
+local wait = 0
+if requests < 1 then
+    wait = math.max(wait, (1 - requests) * window / rpm)
+end
+if tokens < cost then
+    wait = math.max(wait, (cost - tokens) * window / tpm)
+end
 
-async def update_usage(redis, tokens_used):
-    """Update Redis with the latest OpenAI API usage."""
-    current_time = int(time.time())
-    minute_key = f"openai_usage:{current_time // WINDOW_SECONDS}"
+if wait == 0 then
+    requests = requests - 1
+    tokens = tokens - cost
+end
 
-    # Increment counters
-    await redis.incr(f"{minute_key}:requests", amount=1)
-    await redis.incr(f"{minute_key}:tokens", amount=tokens_used)
+redis.call('HSET', KEYS[1], 'requests', requests, 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], window * 2)
+return tostring(wait)
+"""
 
-    # Set expiration to avoid infinite storage
-    await redis.expire(f"{minute_key}:requests", WINDOW_SECONDS)
-    await redis.expire(f"{minute_key}:tokens", WINDOW_SECONDS)
+# Halves the effective rate (down to a floor) after a 429. The scale recovers
+# linearly inside TOKEN_BUCKET_SCRIPT.
+#
+# KEYS[1] = scale hash
+# ARGV = now, backoff, min_scale, recovery_per_second
+RATE_LIMITED_SCRIPT = """
+local now = tonumber(ARGV[1])
+local data = redis.call('HMGET', KEYS[1], 'scale', 'ts')
+local scale = tonumber(data[1]) or 1
+local ts = tonumber(data[2]) or now
+scale = math.min(1, scale + (now - ts) * tonumber(ARGV[4]))
+scale = math.max(tonumber(ARGV[3]), scale * tonumber(ARGV[2]))
+redis.call('HSET', KEYS[1], 'scale', scale, 'ts', now)
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(scale)
+"""
 
-def parse_tweet(tweet_text: str) -> Dict[str, List[str]]:
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token) used to reserve capacity up front."""
+    return len(text) // 4 + 1
+
+
+async def reserve_capacity(redis, tokens: int = 0) -> float:
+    """
+    Tries to take one request and `tokens` tokens from the shared OpenAI bucket.
+
+    Returns:
+        float: 0 if capacity was taken, else the seconds to wait before retrying.
+    """
+    wait = await redis.eval(
+        TOKEN_BUCKET_SCRIPT,
+        2,
+        OPENAI_BUCKET_KEY,
+        OPENAI_SCALE_KEY,
+        time.time(),
+        OPENAI_RPM_LIMIT,
+        OPENAI_TPM_LIMIT,
+        tokens,
+        WINDOW_SECONDS,
+        RATE_RECOVERY_PER_SECOND,
+    )
+    return float(wait)
+
+
+async def can_make_request(redis, tokens: int = 0) -> bool:
+    """Check if we are within OpenAI's rate limits, taking capacity if we are."""
+    return await reserve_capacity(redis, tokens) == 0
+
+
+async def wait_for_capacity(redis, tokens: int = 0):
+    """Waits, without blocking the event loop, until the OpenAI bucket grants capacity."""
+    while True:
+        wait = await reserve_capacity(redis, tokens)
+        if wait == 0:
+            return
+        print(f"OpenAI rate limit reached. Waiting {wait:.1f}s...")
+        await asyncio.sleep(wait)
+
+
+async def openai_capacity(redis) -> Dict[str, float]:
+    """Returns the requests and tokens currently available in the shared OpenAI bucket, without taking any."""
+    async with redis.pipeline() as pipe:
+        pipe.hmget(OPENAI_BUCKET_KEY, "requests", "tokens", "ts")
+        pipe.hmget(OPENAI_SCALE_KEY, "scale", "ts")
+        (requests, tokens, last), (scale, scale_ts) = await pipe.execute()
+
+    now = time.time()
+    scale = float(scale) if scale else 1.0
+    scale = min(1.0, scale + (now - float(scale_ts or now)) * RATE_RECOVERY_PER_SECOND)
+    rpm = OPENAI_RPM_LIMIT * scale
+    tpm = OPENAI_TPM_LIMIT * scale
+    elapsed = now - float(last or now)
+
+    return {
+        "requests": min(rpm, float(requests or rpm) + elapsed * rpm / WINDOW_SECONDS),
+        "tokens": min(tpm, float(tokens or tpm) + elapsed * tpm / WINDOW_SECONDS),
+    }
+
+
+async def update_usage(redis, tokens_used: int, tokens_reserved: int = 0):
+    """
+    Reconciles the token bucket with the tokens a call actually used.
+
+    The difference between what was reserved up front and what the response
+    reported is taken from (or returned to) the bucket.
+    """
+    difference = tokens_used - tokens_reserved
+    if difference:
+        await redis.hincrbyfloat(OPENAI_BUCKET_KEY, "tokens", -difference)
+
+
+async def report_rate_limited(redis) -> float:
+    """Backs the shared rate off after a 429. Returns the new rate scale."""
+    scale = await redis.eval(
+        RATE_LIMITED_SCRIPT,
+        1,
+        OPENAI_SCALE_KEY,
+        time.time(),
+        RATE_LIMIT_BACKOFF,
+        MIN_RATE_SCALE,
+        RATE_RECOVERY_PER_SECOND,
+    )
+    print(f"⚠️ OpenAI rate limit hit! Throttling to {float(scale):.0%} of configured limits.")
+    return float(scale)
+
+
+NEAR_DUPLICATE_THRESHOLD = 0.8  # word-set Jaccard similarity above which tweets count as duplicates
+
+RETWEET_PREFIX = re.compile(r"^rt @\w+:\s*")
+NOISE = re.compile(r"https?://\S+|@\w+")
+WORD = re.compile(r"\w+")
+
+
+def normalize_tweet_text(text: str) -> str:
+    """Lowercases a tweet and strips the retweet prefix, links and mentions for comparison."""
+    text = RETWEET_PREFIX.sub("", text.lower())
+    return " ".join(NOISE.sub(" ", text).split())
+
+
+def engagement_score(tweet: dict) -> int:
+    """Scores a tweet by its public metrics; retweets and quotes weigh more than likes."""
+    metrics = tweet.get("public_metrics") or {}
+    return (
+        metrics.get("like_count", 0)
+        + 2 * metrics.get("retweet_count", 0)
+        + 2 * metrics.get("quote_count", 0)
+        + metrics.get("reply_count", 0)
+    )
+
+
+def select_tweets_for_summary(tweets: List[dict], token_budget: int):
+    """
+    Picks the tweets worth summarizing within a fixed token budget.
+
+    Retweets and near-identical tweets are dropped, the rest are ranked by
+    engagement (then length) and packed greedily until the budget is used.
+
+    Args:
+        tweets (list): Tweets as dicts with "text" and optional "public_metrics".
+        token_budget (int): Maximum estimated tokens of tweet text to keep.
+
+    Returns:
+        tuple: The selected tweets and their estimated token count.
+    """
+    unique = []
+    seen_words = []
+    for tweet in tweets:
+        words = set(WORD.findall(normalize_tweet_text(tweet["text"])))
+        if not words:
+            continue
+
+        if any(
+            len(words & other) / len(words | other) >= NEAR_DUPLICATE_THRESHOLD
+            for other in seen_words
+        ):
+            continue
+
+        seen_words.append(words)
+        unique.append(tweet)
+
+    unique.sort(key=lambda tweet: (engagement_score(tweet), len(tweet["text"])), reverse=True)
+
+    selected = []
+    used_tokens = 0
+    for tweet in unique:
+        tweet_tokens = estimate_tokens(tweet["text"])
+        if used_tokens + tweet_tokens > token_budget:
+            continue
+        selected.append(tweet)
+        used_tokens += tweet_tokens
+
+    return selected, used_tokens
+
+
+# The first character of a token tells its kind.
+TOKEN_KINDS = {"h": "link", "@": "mention", "#": "hashtag", "$": "cashtag"}
+
+
+@functools.cache
+def tweet_token_pattern() -> re.Pattern:
+    """
+    Compiles (once, on first use) the pattern for links, mentions, hashtags and cashtags.
+
+    The branches are left ungrouped (see TOKEN_KINDS) so re can skip ahead to
+    their first characters; named groups make it try every branch at every
+    position.
     """
-    Parses a tweet and identifies components like mentions, hashtags, links, emojis, and new lines.
+    return re.compile(
+        r"https?://\S+"
+        r"|@\w+"
+        r"|#\w+"
+        r"|\$[A-Za-z][A-Za-z0-9_]{0,9}\b"
+    )
+
+
+@functools.cache
+def emoji_matcher():
+    """
+    Builds (once, on first use) what find_emojis needs: a search for characters
+    that might start an emoji, and for each character that does, the lengths
+    of the emojis starting with it, longest first.
+
+    Keycaps are the only emoji starting with ASCII (0-9, # or *), so those
+    characters only count when a keycap mark follows. Everything else is
+    found by a plain non-ASCII search: a class of the ~1,400 real first
+    characters would be matched linearly by re, as most are outside the BMP.
+    """
+    search = re.compile("[^\x00-\x7f]|[0-9#*](?=[\ufe0f\u20e3])").search
+    lengths = {}
+    for e in emoji.EMOJI_DATA:
+        lengths.setdefault(e[0], set()).add(len(e))
+    return search, {first: sorted(n, reverse=True) for first, n in lengths.items()}
+
+
+def find_emojis(text: str, start: int, end: int, found: List[str]):
+    """
+    Appends the emojis in text[start:end] to found.
+
+    ASCII text is skipped by a single regex search; at each character an
+    emoji can start with, the longest sequence in emoji.EMOJI_DATA wins, so
+    ZWJ sequences, skin tones, flags and keycaps count as one emoji.
+    """
+    search, lengths = emoji_matcher()
+    match = search(text, start, end)
+    while match:
+        position = match.start()
+        for length in lengths.get(text[position], ()):
+            candidate = text[position:position + length]
+            if position + length <= end and candidate in emoji.EMOJI_DATA:
+                found.append(candidate)
+                position += length
+                break
+        else:
+            position += 1
+        match = search(text, position, end)
+
+
+def parse_tweet(tweet_text: str, finditer=None) -> Dict[str, List[str]]:
+    """
+    Parses a tweet and identifies components like mentions, hashtags, cashtags, links, emojis, and new lines.
+
+    Links, mentions, hashtags and cashtags come from a single scan of the
+    tweet; emojis are looked up only in the text between them.
 
     Args:
         tweet_text (str): The raw tweet text.
+        finditer: The compiled tokenizer's finditer, passed by parse_tweets to
+            skip the lookup per tweet.
 
     Returns:
         dict: A dictionary containing the parsed components of the tweet.
     """
-    # Extract hashtags
-    hashtags = re.findall(r"#\w+", tweet_text)
+    if finditer is None:
+        finditer = tweet_token_pattern().finditer
+
+    tokens = {"link": [], "mention": [], "hashtag": [], "cashtag": []}
+    emojis = []
+    cleaned = []
+    position = 0  # end of the last token removed from the main text
+    scanned = 0  # end of the last token of any kind
 
-    # Extract mentions
-    mentions = re.findall(r"@\w+", tweet_text)
+    for match in finditer(tweet_text):
+        find_emojis(tweet_text, scanned, match.start(), emojis)
+        scanned = match.end()
 
-    # Extract links
-    links = re.findall(r"https?://\S+", tweet_text)
+        token = match.group()
+        kind = TOKEN_KINDS[token[0]]
+        tokens[kind].append(token)
 
-    # Extract emojis
-    emojis = [char for char in tweet_text if char in emoji.EMOJI_DATA]
+        # Hashtags, mentions and links are removed from the main text;
+        # cashtags and emojis stay in it.
+        if kind in ("link", "mention", "hashtag"):
+            cleaned.append(tweet_text[position:match.start()])
+            position = match.end()
 
-    # Remove hashtags, mentions, and links to isolate the main text
-    cleaned_text = re.sub(r"(@\w+|#\w+|https?://\S+)", "", tweet_text).strip()
+    find_emojis(tweet_text, scanned, len(tweet_text), emojis)
+    cleaned.append(tweet_text[position:])
+    cleaned_text = "".join(cleaned)
 
     # Split main text by new lines
     lines = [line.strip() for line in cleaned_text.split("\n") if line.strip()]
@@ -78,66 +347,116 @@ def parse_tweet(tweet_text: str) -> Dict[str, List[str]]:
     return {
         "original_tweet": tweet_text,
         "parsed_data": {
-            "hashtags": hashtags,
-            "mentions": mentions,
-            "links": links,
+            "hashtags": tokens["hashtag"],
+            "mentions": tokens["mention"],
+            "cashtags": tokens["cashtag"],
+            "links": tokens["link"],
             "emojis": emojis,
             "main_text_lines": lines,
         },
     }
-  
-    
-# def is_obvious_bot(user):
-#     """Quickly check for obvious bot-like behavior using basic rules."""
-#     try:
-#         # user = api.get_user(screen_name=username)
-#         bot_score = 0
-
-#         # Rule 1: Low followers, high following
-#         if user.followers_count < 10 and user.friends_count > 100:
-#             bot_score += 2
-        
-#         # Rule 2: No profile picture
-#         if not user.profile_image_url or "default" in user.profile_image_url:
-#             bot_score += 2
-        
-#         # Rule 3: Suspicious username (contains numbers)
-#         if any(char.isdigit() for char in user.screen_name): 
-#             bot_score += 1
-        
-#         # Rule 4: No bio or very short bio
-#         if len(user.description) < 10:
-#             bot_score += 1
-        
-#         # Rule 5: High activity in a short period (new account but lots of tweets)
-#         if user.statuses_count > 5000 and user.created_at.year > 2023:
-#             bot_score += 3
-        
-#         # Rule 6: Default profile settings
-#         if user.default_profile:
-#             bot_score += 1
-
-#         return bot_score > 4  # Returns True if the bot score is high
-#     except tweepy.TweepError:
-#         return False  
-
-# def check_bot(user, username):
-#     """First run rule-based detection, then check Botometer if needed."""
-#     if is_obvious_bot(user=user):
-#         print(f"⚠️ {username} looks like a bot based on rules! No need for Botometer.")
-#         return True  # Confirmed bot
-
-#     try:
-#         # Step 2: Run Botometer if the account is suspicious based on rules
-#         result = botometer_api.check_account(username)
-#         bot_score = result['display_scores']['universal']
-        
-#         if bot_score > 3:  # Botometer score > 3 means high bot likelihood
-#             print(f"🤖 {username} is likely a bot! (Botometer Score: {bot_score}/5)")
-#             return True
-#         else:
-#             print(f"✅ {username} looks like a human! (Botometer Score: {bot_score}/5)")
-#             return False
-#     except Exception as e:
-#         print(f"⚠️ Error checking {username} on Botometer: {e}")
-#         return False  # Assume not a bot if API fails
+
+
+def parse_tweets(tweet_texts: Iterable[str]) -> List[Dict[str, List[str]]]:
+    """
+    Parses a batch of tweets, e.g. a page of search results.
+
+    Args:
+        tweet_texts (Iterable[str]): The raw tweet texts.
+
+    Returns:
+        list: One parse_tweet result per tweet, in order.
+    """
+    finditer = tweet_token_pattern().finditer
+    return [parse_tweet(text, finditer) for text in tweet_texts]
+
+
+BOT_VERDICT_KEY = "bot_verdict:{author_id}"
+BOT_VERDICT_TTL = 60 * 60 * 24 * 7  # re-check an author after a week
+BOT_SCORE_THRESHOLD = 5  # at or above: a bot, no LLM call needed
+HUMAN_SCORE_THRESHOLD = -2  # at or below: a human, no LLM bot check needed
+
+
+def bot_score(author: dict) -> int:
+    """
+    Scores an author's bot likelihood from profile metadata. Higher is more bot-like.
+
+    Args:
+        author (dict): Author fields from the mentions request (see read_mentions).
+    """
+    score = 0
+    followers = author.get("followers_count", 0)
+    following = author.get("following_count", 0)
+    tweets = author.get("tweet_count", 0)
+
+    created_at = author.get("created_at")
+    age_days = None
+    if created_at:
+        created = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+        age_days = max(1, (datetime.now(timezone.utc) - created).days)
+
+    # Rule 1: Low followers, high following
+    if followers < 10 and following > 100:
+        score += 2
+
+    # Rule 2: No profile picture
+    if "default_profile" in (author.get("profile_image_url") or "default_profile"):
+        score += 2
+
+    # Rule 3: Suspicious username (long run of digits, e.g. name84736251)
+    if sum(char.isdigit() for char in author.get("username", "")) >= 4:
+        score += 1
+
+    # Rule 4: No bio or very short bio
+    if len(author.get("description") or "") < 10:
+        score += 1
+
+    # Rule 5: High activity in a short period (new account but lots of tweets)
+    if age_days is not None and age_days < 365 and tweets > 5000:
+        score += 3
+    if age_days is not None and tweets / age_days > 150:
+        score += 2
+
+    # Human signals: verified, or an established account with a real following
+    if author.get("verified"):
+        score -= 3
+    if age_days is not None and age_days > 365 * 2 and followers > 500 and followers > following / 2:
+        score -= 3
+
+    return score
+
+
+def classify_author(author: dict):
+    """Returns "bot" or "human" for clear-cut authors, or None when the LLM should decide."""
+    score = bot_score(author)
+    if score >= BOT_SCORE_THRESHOLD:
+        return "bot"
+    if score <= HUMAN_SCORE_THRESHOLD:
+        return "human"
+    return None
+
+
+async def cache_bot_verdict(redis, author_id, verdict: str):
+    """Stores a "bot"/"human" verdict for an author."""
+    await redis.set(BOT_VERDICT_KEY.format(author_id=author_id), verdict, ex=BOT_VERDICT_TTL)
+
+
+async def prefilter_author(redis, author: dict):
+    """
+    Local bot check that runs before the LLM.
+
+    Returns a cached verdict if there is one, else scores the author's profile
+    and caches clear-cut results.
+
+    Returns:
+        str: "bot", "human", or None for ambiguous authors.
+    """
+    cached = await redis.get(BOT_VERDICT_KEY.format(author_id=author["id"]))
+    if cached:
+        return cached
+
+    verdict = classify_author(author)
+    if verdict:
+        print(f"@{author.get('username')} classified as {verdict} by profile rules.")
+        await cache_bot_verdict(redis, author["id"], verdict)
+    return verdict
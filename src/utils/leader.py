@@ -0,0 +1,69 @@
+import asyncio
+import uuid
+
+from src.utils.cache import RELEASE_LOCK_SCRIPT
+from src.utils.mention_queue import consumer_name
+from src.utils.metrics import leader_status
+
+LEADER_KEY = "leader:{name}"
+
+# Compare-and-expire so a process only ever extends its own lease
+RENEW_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class LeaderLease:
+    """
+    A Redis lease electing one leader among processes competing for `name`.
+
+    The holder renews the lease every third of its TTL; if it dies or loses
+    Redis, the lease expires and a standby takes over within one TTL.
+    """
+
+    def __init__(self, redis, name: str, ttl: float):
+        self.redis = redis
+        self.name = name
+        self.key = LEADER_KEY.format(name=name)
+        self.ttl = ttl
+        self.token = f"{consumer_name()}:{uuid.uuid4().hex}"
+        self.is_leader = False
+
+    async def try_acquire(self) -> bool:
+        """Renews the lease if held, else takes it if it is free. Returns whether we lead."""
+        ttl_ms = int(self.ttl * 1000)
+        was_leader = self.is_leader
+        try:
+            if self.is_leader:
+                self.is_leader = bool(
+                    await self.redis.eval(RENEW_LEASE_SCRIPT, 1, self.key, self.token, ttl_ms)
+                )
+            if not self.is_leader:
+                self.is_leader = bool(
+                    await self.redis.set(self.key, self.token, nx=True, px=ttl_ms)
+                )
+        except Exception as e:
+            # Without Redis we can't prove we still hold the lease.
+            print(f"Error renewing {self.name} lease: {e}")
+            self.is_leader = False
+
+        if self.is_leader != was_leader:
+            print(f"{'Acquired' if self.is_leader else 'Lost'} {self.name} leadership.")
+        leader_status.set(int(self.is_leader), lease=self.name)
+        return self.is_leader
+
+    async def maintain(self):
+        """Keeps trying to acquire or renew the lease until cancelled."""
+        while True:
+            await self.try_acquire()
+            await asyncio.sleep(self.ttl / 3)
+
+    async def release(self):
+        """Gives up the lease, if held, so a standby can take over immediately."""
+        if self.is_leader:
+            self.is_leader = False
+            leader_status.set(0, lease=self.name)
+            await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, self.key, self.token)
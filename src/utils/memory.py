@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from langchain_core.messages import trim_messages
+from langgraph.checkpoint.memory import MemorySaver
+
+
+class BoundedMemorySaver(MemorySaver):
+    """
+    MemorySaver that keeps agent memory bounded for a long-running worker.
+
+    - Only the latest `max_checkpoints` checkpoints of each thread are kept.
+    - Threads untouched for `max_age` seconds are dropped.
+    - Beyond `max_threads`, the least recently used threads are dropped.
+    - With `max_messages`, a thread's stored messages are trimmed to the same
+      window windowed_state_modifier sends to the model, so a long
+      conversation doesn't keep its whole history.
+    """
+
+    def __init__(
+        self,
+        max_threads: int = 500,
+        max_age: float = 6 * 60 * 60,
+        max_checkpoints: int = 2,
+        max_messages: Optional[int] = None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.max_age = max_age
+        self.max_checkpoints = max_checkpoints
+        self.max_messages = max_messages
+        self.last_used = OrderedDict()  # thread_id -> last write time
+        self.lock = threading.Lock()
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        values = checkpoint["channel_values"]
+        if self.max_messages is not None and "messages" in new_versions and "messages" in values:
+            checkpoint = {
+                **checkpoint,
+                "channel_values": {**values, "messages": window(values["messages"], self.max_messages)},
+            }
+
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+
+        with self.lock:
+            self.last_used[thread_id] = time.time()
+            self.last_used.move_to_end(thread_id)
+            self.prune_thread(thread_id, config["configurable"].get("checkpoint_ns", ""))
+            self.evict()
+
+        return next_config
+
+    def prune_thread(self, thread_id: str, checkpoint_ns: str):
+        """Drops all but the newest checkpoints of a thread, with their writes and blobs."""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        # Checkpoint ids are time-ordered, so sorting puts the newest last.
+        stale = sorted(checkpoints)[: -self.max_checkpoints]
+        if not stale:
+            return
+
+        for checkpoint_id in stale:
+            del checkpoints[checkpoint_id]
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+
+        # Channel values are stored once per version; keep only the versions
+        # the remaining checkpoints still point at.
+        blobs = getattr(self, "blobs", None)
+        if blobs is None:
+            return
+
+        referenced = set()
+        for saved_checkpoint, *_ in checkpoints.values():
+            referenced.update(self.serde.loads_typed(saved_checkpoint)["channel_versions"].items())
+
+        for key in [
+            key
+            for key in blobs
+            if key[:2] == (thread_id, checkpoint_ns) and key[2:] not in referenced
+        ]:
+            del blobs[key]
+
+    def evict(self):
+        """Drops threads that are too old or beyond the thread limit."""
+        cutoff = time.time() - self.max_age
+        while self.last_used:
+            thread_id, last_used = next(iter(self.last_used.items()))
+            if last_used >= cutoff and len(self.last_used) <= self.max_threads:
+                break
+            self.last_used.popitem(last=False)
+            self.delete_thread(thread_id)
+
+    def delete_thread(self, thread_id: str):
+        """Removes every checkpoint, write and blob stored for a thread."""
+        self.storage.pop(thread_id, None)
+        for key in [key for key in self.writes if key[0] == thread_id]:
+            del self.writes[key]
+        blobs = getattr(self, "blobs", None)
+        if blobs is not None:
+            for key in [key for key in blobs if key[0] == thread_id]:
+                del blobs[key]
+
+
+def window(messages, max_messages: int):
+    """The last `max_messages` messages, starting on a human message."""
+    return trim_messages(
+        messages,
+        max_tokens=max_messages,
+        token_counter=len,
+        strategy="last",
+        start_on="human",
+        allow_partial=False,
+    )
+
+
+def windowed_state_modifier(system_message, max_messages: int):
+    """
+    Builds a create_react_agent state_modifier that sends the system message plus
+    only the last `max_messages` messages of the thread to the model.
+    """
+
+    def modifier(state):
+        return [system_message, *window(state["messages"], max_messages)]
+
+    return modifier
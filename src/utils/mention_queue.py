@@ -0,0 +1,152 @@
+import json
+import os
+import socket
+from typing import Iterable, List, Optional, Tuple
+
+from redis.exceptions import ResponseError
+
+# Mentions flow from the poller to the reply workers through one Redis Stream.
+# Every worker reads through the same consumer group, so each entry is
+# delivered to exactly one worker and stays pending until that worker acks it.
+MENTION_STREAM = "mentions:stream"
+MENTION_GROUP = "mention-workers"
+DEAD_LETTER_STREAM = "mentions:dead"
+
+# Entries kept in the stream, trimmed approximately on publish
+MENTION_STREAM_MAXLEN = 10000
+
+# A mention is published at most once within this window, so overlapping
+# polls (e.g. after a poller restart) don't queue it twice.
+QUEUED_KEY = "mention_queued:{tweet_id}"
+QUEUED_TTL = 60 * 60 * 24
+
+# Queues a mention unless it was queued within the TTL. The marker is set only
+# after the XADD succeeds, so a failed publish leaves nothing behind and the
+# mention is published on the next poll.
+#
+# KEYS[1] = queued marker, KEYS[2] = stream
+# ARGV = marker ttl seconds, stream maxlen, mention json
+PUBLISH_MENTION_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[2], '*', 'mention', ARGV[3])
+redis.call('SET', KEYS[1], 1, 'EX', ARGV[1])
+return 1
+"""
+
+Entry = Tuple[str, dict]
+
+
+def consumer_name() -> str:
+    """Names this process within the consumer group (the Heroku dyno, else host and pid)."""
+    return os.getenv("DYNO") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+async def ensure_mention_group(redis):
+    """Creates the stream and its consumer group if they don't exist yet."""
+    try:
+        await redis.xgroup_create(MENTION_STREAM, MENTION_GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def publish_mentions(redis, tweets: Iterable[dict]) -> int:
+    """
+    Queues mentions for the reply workers.
+
+    Mentions already queued within QUEUED_TTL are skipped. A mention whose
+    publish fails is not marked as queued, so the next poll publishes it.
+
+    Returns:
+        int: The number of mentions published.
+    """
+    tweets = list(tweets)
+    if not tweets:
+        return 0
+
+    async with redis.pipeline(transaction=False) as pipe:
+        for tweet in tweets:
+            pipe.eval(
+                PUBLISH_MENTION_SCRIPT,
+                2,
+                QUEUED_KEY.format(tweet_id=tweet["id"]),
+                MENTION_STREAM,
+                QUEUED_TTL,
+                MENTION_STREAM_MAXLEN,
+                json.dumps(tweet),
+            )
+        published = await pipe.execute()
+
+    return sum(published)
+
+
+def decode_entries(entries) -> List[Entry]:
+    return [(entry_id, json.loads(fields["mention"])) for entry_id, fields in entries if fields]
+
+
+async def read_new_mentions(redis, consumer: str, count: int, block_ms: Optional[int] = 5000) -> List[Entry]:
+    """Reads up to `count` never-delivered mentions, blocking up to block_ms (None: don't block)."""
+    response = await redis.xreadgroup(
+        MENTION_GROUP, consumer, {MENTION_STREAM: ">"}, count=count, block=block_ms
+    )
+    if not response:
+        return []
+    _, entries = response[0]
+    return decode_entries(entries)
+
+
+async def claim_stale_mentions(
+    redis, consumer: str, min_idle_ms: int, count: int, max_deliveries: int
+) -> List[Entry]:
+    """
+    Takes over mentions another worker read but never acked (it crashed or timed out).
+
+    Entries that would be delivered more than max_deliveries times are moved to
+    DEAD_LETTER_STREAM and acked instead of being retried forever.
+    """
+    # Redis 7 adds a third element (ids deleted from the stream) to the reply
+    entries = (
+        await redis.xautoclaim(
+            MENTION_STREAM, MENTION_GROUP, consumer, min_idle_ms, start_id="0-0", count=count
+        )
+    )[1]
+    if not entries:
+        return []
+
+    pending = await redis.xpending_range(
+        MENTION_STREAM,
+        MENTION_GROUP,
+        min=entries[0][0],
+        max=entries[-1][0],
+        count=len(entries),
+        consumername=consumer,
+    )
+    deliveries = {item["message_id"]: item["times_delivered"] for item in pending}
+
+    claimed, dead = [], []
+    for entry_id, fields in entries:
+        # Entries trimmed from the stream while pending come back without fields
+        if not fields or deliveries.get(entry_id, 0) > max_deliveries:
+            dead.append((entry_id, fields))
+        else:
+            claimed.append((entry_id, fields))
+
+    if dead:
+        async with redis.pipeline(transaction=False) as pipe:
+            for entry_id, fields in dead:
+                if fields:
+                    pipe.xadd(DEAD_LETTER_STREAM, fields, maxlen=MENTION_STREAM_MAXLEN, approximate=True)
+            pipe.xack(MENTION_STREAM, MENTION_GROUP, *(entry_id for entry_id, _ in dead))
+            await pipe.execute()
+        print(f"Moved {len(dead)} undeliverable mentions to {DEAD_LETTER_STREAM}")
+
+    return decode_entries(claimed)
+
+
+async def ack_mentions(redis, entry_ids: Iterable[str]):
+    """Marks mentions as handled so they are never redelivered."""
+    entry_ids = list(entry_ids)
+    if entry_ids:
+        await redis.xack(MENTION_STREAM, MENTION_GROUP, *entry_ids)
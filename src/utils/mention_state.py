@@ -0,0 +1,93 @@
+import asyncio
+from typing import Dict, Iterable, List
+
+from src.services import services
+
+MENTIONS_TABLE = "recluse_mentions"
+
+
+async def fetch_mention_states(tweet_ids: Iterable[int]) -> Dict[int, dict]:
+    """
+    Fetches the stored state of a batch of mentions with a single query.
+
+    Args:
+        tweet_ids (Iterable[int]): The mention tweet IDs to look up.
+
+    Returns:
+        dict: Rows from recluse_mentions keyed by tweet ID. Unknown IDs are absent.
+    """
+    tweet_ids = list(tweet_ids)
+    if not tweet_ids:
+        return {}
+
+    response = await asyncio.to_thread(
+        lambda: services.supabase.table(MENTIONS_TABLE)
+        .select("*")
+        .in_("id", tweet_ids)
+        .execute()
+    )
+    return {int(row["id"]): row for row in response.data or []}
+
+
+async def insert_new_mentions(tweet_ids: Iterable[int]):
+    """Inserts rows for newly seen mentions in one bulk upsert, ignoring existing rows."""
+    rows = [{"id": tweet_id, "replied_status": False} for tweet_id in tweet_ids]
+    if not rows:
+        return
+
+    await asyncio.to_thread(
+        lambda: services.supabase.table(MENTIONS_TABLE)
+        .upsert(rows, on_conflict="id", ignore_duplicates=True)
+        .execute()
+    )
+
+
+class MentionStatusBuffer:
+    """
+    Collects bot_status/replied_status changes and writes them in batches.
+
+    Updates that set the same columns are grouped into a single
+    update ... where id in (...) statement, so a cycle with many replies costs
+    one write per distinct status instead of one per mention.
+    """
+
+    def __init__(self):
+        self._pending: Dict[tuple, List[int]] = {}
+
+    def __len__(self):
+        return sum(len(ids) for ids in self._pending.values())
+
+    def add(self, tweet_id: int, status: dict):
+        """Queues a status change for a mention."""
+        key = tuple(sorted(status.items()))
+        tweet_ids = self._pending.setdefault(key, [])
+        if tweet_id not in tweet_ids:
+            tweet_ids.append(tweet_id)
+
+    async def flush(self) -> List[int]:
+        """
+        Writes all queued status changes and clears the buffer.
+
+        Returns:
+            list: The IDs of the mentions whose status was written.
+        """
+        pending, self._pending = self._pending, {}
+        written = []
+
+        for key, tweet_ids in pending.items():
+            status = dict(key)
+            try:
+                await asyncio.to_thread(
+                    lambda: services.supabase.table(MENTIONS_TABLE)
+                    .update(status)
+                    .in_("id", tweet_ids)
+                    .execute()
+                )
+                print(f"Updated {len(tweet_ids)} mentions with {status}")
+                written.extend(tweet_ids)
+            except Exception as e:
+                # Keep the failed batch so the next flush retries it.
+                print(f"Error updating mention statuses {status}: {e}")
+                self._pending.setdefault(key, []).extend(tweet_ids)
+
+        return written
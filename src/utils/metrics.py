@@ -0,0 +1,166 @@
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from a fast Redis check to a slow LLM round-trip
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Every metric created below, in exposition order
+registry = []
+
+
+def format_labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Metric:
+    """Base for metrics exposed in the Prometheus text format."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labels=()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self.values = {}
+        registry.append(self)
+
+    def key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield self.name, key, value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, value in self.samples():
+            lines.append(f"{name}{format_labels(self.label_names, key)} {value}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self.key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self.values[self.key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self.key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self.key(labels)
+        state = self.values.get(key)
+        if state is None:
+            state = self.values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state["counts"][i] += 1
+        state["sum"] += value
+        state["count"] += 1
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        names = self.label_names + ("le",)
+        for key, state in self.values.items():
+            for bound, count in zip(self.buckets, state["counts"]):
+                lines.append(f"{self.name}_bucket{format_labels(names, key + (bound,))} {count}")
+            lines.append(f"{self.name}_bucket{format_labels(names, key + ('+Inf',))} {state['count']}")
+            lines.append(f"{self.name}_sum{format_labels(self.label_names, key)} {state['sum']}")
+            lines.append(f"{self.name}_count{format_labels(self.label_names, key)} {state['count']}")
+        return "\n".join(lines)
+
+
+def render_metrics() -> str:
+    """Renders every registered metric in the Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in registry) + "\n"
+
+
+# Agent metrics
+stage_seconds = Histogram(
+    "recluse_stage_seconds",
+    "Time spent in each stage of processing a mention.",
+    labels=("stage",),
+)
+stage_total = Counter(
+    "recluse_stage_total",
+    "Mention-processing stages run, by outcome.",
+    labels=("stage", "outcome"),
+)
+mentions_total = Counter(
+    "recluse_mentions_total",
+    "Mentions handled, by result.",
+    labels=("result",),
+)
+prompt_tokens_total = Counter(
+    "recluse_prompt_tokens_total",
+    "Tokens used by LLM calls, per prompt template.",
+    labels=("template",),
+)
+prompt_prefix_tokens = Gauge(
+    "recluse_prompt_prefix_tokens",
+    "Tokens in the fixed system + instruction prefix of each prompt template.",
+    labels=("template",),
+)
+cache_requests_total = Counter(
+    "recluse_cache_requests_total",
+    "Cache lookups, by cache and where the value came from (local, redis, coalesced or miss).",
+    labels=("cache", "result"),
+)
+mention_queue_depth = Gauge(
+    "recluse_mention_queue_depth",
+    "Mentions taken from the queue by this worker that are still waiting or in progress.",
+)
+leader_status = Gauge(
+    "recluse_leader",
+    "1 while this process holds the named leader lease, else 0.",
+    labels=("lease",),
+)
+twitter_headroom = Gauge(
+    "recluse_twitter_rate_limit_headroom",
+    "Calls left in the current rate-limit window, per Twitter endpoint.",
+    labels=("endpoint",),
+)
+openai_headroom = Gauge(
+    "recluse_openai_rate_limit_headroom",
+    "Capacity left in the shared OpenAI token bucket.",
+    labels=("resource",),
+)
+
+
+@contextmanager
+def track_stage(stage: str):
+    """Times a block as one run of a processing stage, counting errors separately."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        stage_total.inc(stage=stage, outcome="error")
+        raise
+    else:
+        stage_total.inc(stage=stage, outcome="ok")
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, stage=stage)
@@ -0,0 +1,132 @@
+import asyncio
+import json
+from typing import Dict, Iterable, List, Optional
+
+PROFILE_KEY = "profile:{field}:{value}"
+TIMELINE_KEY = "timeline:{user_id}"
+
+# Usernames and IDs per users lookup (the X API maximum)
+USERS_PER_LOOKUP = 100
+
+# Stored in place of a profile for users that don't exist
+MISSING = "null"
+
+
+def profile_key(field: str, value) -> str:
+    # Usernames are case-insensitive on Twitter
+    return PROFILE_KEY.format(field=field, value=str(value).lower())
+
+
+class ProfileCache:
+    """
+    Redis-backed cache of user profiles and recent timelines, shared by every process.
+
+    Profiles are cached under both username and ID; users that don't exist are
+    cached too (for negative_ttl), so a bad handle isn't looked up again on
+    every request. Cold lookups made within `batch_window` of each other, from
+    any number of callers, go out as a single users lookup.
+
+    Args:
+        fetch_users: Coroutine function (field, values) -> list of profile dicts,
+            where field is "username" or "id". Users not returned are missing.
+        fetch_timeline: Coroutine function (user_id, count) -> list of tweet dicts.
+        profile_ttl (int): Seconds a profile stays fresh.
+        timeline_ttl (int): Seconds a timeline stays fresh.
+        negative_ttl (int): Seconds a missing user is remembered.
+        batch_window (float): Seconds cold lookups wait to be batched together.
+    """
+
+    def __init__(self, fetch_users, fetch_timeline, profile_ttl: int, timeline_ttl: int,
+                 negative_ttl: int = 300, batch_window: float = 0.01):
+        self.fetch_users = fetch_users
+        self.fetch_timeline = fetch_timeline
+        self.profile_ttl = profile_ttl
+        self.timeline_ttl = timeline_ttl
+        self.negative_ttl = negative_ttl
+        self.batch_window = batch_window
+        self.waiting = {"username": {}, "id": {}}  # field -> value -> future
+        self.flushes = {}  # field -> scheduled batch task
+
+    async def get_profiles(self, redis, field: str, values: Iterable) -> Dict[str, Optional[dict]]:
+        """
+        Looks up several users by "username" or "id".
+
+        Returns:
+            dict: Profile (or None if the user doesn't exist) keyed by the lowercased value.
+        """
+        values = list(dict.fromkeys(str(value).lower() for value in values))
+        if not values:
+            return {}
+
+        cached = await redis.mget([profile_key(field, value) for value in values])
+        profiles = {
+            value: json.loads(raw) for value, raw in zip(values, cached) if raw is not None
+        }
+
+        cold = [value for value in values if value not in profiles]
+        if cold:
+            results = await asyncio.gather(*(self.load(redis, field, value) for value in cold))
+            profiles.update(zip(cold, results))
+
+        return profiles
+
+    async def get_profile(self, redis, username: str = None, user_id=None) -> Optional[dict]:
+        """Looks up one user by username or ID. Returns None if the user doesn't exist."""
+        field, value = ("username", username) if username else ("id", user_id)
+        return (await self.get_profiles(redis, field, [value]))[str(value).lower()]
+
+    async def get_timeline(self, redis, user_id, count: int) -> List[dict]:
+        """Returns up to `count` of the user's latest tweets, reusing a cached fetch of at least as many."""
+        key = TIMELINE_KEY.format(user_id=user_id)
+        cached = await redis.get(key)
+        if cached is not None:
+            timeline = json.loads(cached)
+            if timeline["count"] >= count:
+                return timeline["tweets"][:count]
+
+        tweets = await self.fetch_timeline(user_id, count)
+        await redis.set(key, json.dumps({"count": count, "tweets": tweets}), ex=self.timeline_ttl)
+        return tweets
+
+    def load(self, redis, field: str, value: str) -> asyncio.Future:
+        """Queues a cold lookup for the next batch, sharing any lookup already queued."""
+        waiting = self.waiting[field]
+        if value not in waiting:
+            waiting[value] = asyncio.get_running_loop().create_future()
+            if field not in self.flushes:
+                self.flushes[field] = asyncio.create_task(self.flush(redis, field))
+        return asyncio.shield(waiting[value])
+
+    async def flush(self, redis, field: str):
+        """Resolves the queued lookups for a field with as few users lookups as possible."""
+        await asyncio.sleep(self.batch_window)
+        batch, self.waiting[field] = self.waiting[field], {}
+        del self.flushes[field]
+
+        values = list(batch)
+        for start in range(0, len(values), USERS_PER_LOOKUP):
+            chunk = values[start:start + USERS_PER_LOOKUP]
+            try:
+                found = await self.fetch_users(field, chunk)
+                profiles = {str(profile[field]).lower(): profile for profile in found}
+                await self.store(redis, field, chunk, profiles)
+            except Exception as e:
+                for value in chunk:
+                    batch[value].set_exception(e)
+                    batch[value].exception()  # mark retrieved when nobody else is waiting
+                continue
+
+            for value in chunk:
+                batch[value].set_result(profiles.get(value))
+
+    async def store(self, redis, field: str, values: List[str], profiles: Dict[str, dict]):
+        async with redis.pipeline(transaction=False) as pipe:
+            for value in values:
+                profile = profiles.get(value)
+                if profile is None:
+                    pipe.set(profile_key(field, value), MISSING, ex=self.negative_ttl)
+                    continue
+                payload = json.dumps(profile)
+                pipe.set(profile_key("username", profile["username"]), payload, ex=self.profile_ttl)
+                pipe.set(profile_key("id", profile["id"]), payload, ex=self.profile_ttl)
+            await pipe.execute()
@@ -0,0 +1,94 @@
+import asyncio
+import time
+import uuid
+
+# Per-endpoint budgets as (max calls, window in seconds). These follow the X API
+# Basic tier per-user limits; adjust them for your plan.
+ENDPOINT_LIMITS = {
+    "mentions": (10, 60 * 15),  # GET /2/users/:id/mentions
+    "search_recent": (60, 60 * 15),  # GET /2/tweets/search/recent
+    "create_tweet": (100, 60 * 60 * 24),  # POST /2/tweets
+    "home_timeline": (15, 60 * 15),  # GET /2/users/:id/timelines/reverse_chronological
+    "user_tweets": (10, 60 * 15),  # GET /2/users/:id/tweets
+    "users_lookup": (100, 60 * 60 * 24),  # GET /2/users, /2/users/by
+    "default": (15, 60 * 15),
+}
+
+RATE_LIMIT_KEY = "rate_limit:{endpoint}:{account}"
+
+# Sliding-window log kept in a sorted set scored by call time. Expired calls are
+# trimmed and the new call recorded in the same script, so concurrent workers
+# can never overshoot the budget.
+#
+# KEYS[1] = sorted set
+# ARGV = now_ms, window_ms, limit, member
+# Returns 0 if the call was recorded, else the milliseconds until a slot frees up.
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[4])
+    redis.call('PEXPIRE', KEYS[1], window)
+    return 0
+end
+
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return math.max(1, tonumber(oldest[2]) + window - now)
+"""
+
+
+def get_limit(endpoint: str):
+    """Returns the (max calls, window seconds) budget for an endpoint."""
+    return ENDPOINT_LIMITS.get(endpoint, ENDPOINT_LIMITS["default"])
+
+
+async def acquire(redis, endpoint: str, account: str = "default") -> float:
+    """
+    Tries to record a call against an endpoint's budget for an account.
+
+    Returns:
+        float: 0 if the call may proceed, else the seconds until a slot is available.
+    """
+    max_calls, window = get_limit(endpoint)
+    wait_ms = await redis.eval(
+        SLIDING_WINDOW_SCRIPT,
+        1,
+        RATE_LIMIT_KEY.format(endpoint=endpoint, account=account),
+        int(time.time() * 1000),
+        window * 1000,
+        max_calls,
+        uuid.uuid4().hex,
+    )
+    return int(wait_ms) / 1000
+
+
+async def wait_for_slot(redis, endpoint: str, account: str = "default", max_wait: float = None) -> float:
+    """
+    Waits until a call against the endpoint's budget can be recorded.
+
+    Args:
+        max_wait (float): Give up instead of sleeping if the next slot is further
+            away than this many seconds. None waits as long as needed.
+
+    Returns:
+        float: 0 once the call was recorded, or the seconds until the next slot
+        if that exceeded max_wait.
+    """
+    while True:
+        wait = await acquire(redis, endpoint, account)
+        if wait == 0:
+            return 0
+        if max_wait is not None and wait > max_wait:
+            return wait
+        await asyncio.sleep(wait)
+
+
+async def headroom(redis, endpoint: str, account: str = "default") -> int:
+    """Returns how many calls are left in the endpoint's current window."""
+    max_calls, window = get_limit(endpoint)
+    key = RATE_LIMIT_KEY.format(endpoint=endpoint, account=account)
+    used = await redis.zcount(key, f"({int((time.time() - window) * 1000)}", "+inf")
+    return max(0, max_calls - used)
@@ -0,0 +1,83 @@
+import time
+from typing import Iterable, List, Optional, Set
+
+# Every reply is recorded here, keyed by the mention it answers, before it is
+# sent. The key doubles as the reply's idempotency key: a mention gets at most
+# one outbox record, so a retried mention resends the recorded message (which
+# Twitter rejects as duplicate content if the first send went through) instead
+# of composing and posting a second reply.
+OUTBOX_KEY = "reply_outbox:{tweet_id}"
+OUTBOX_TTL = 60 * 60 * 24 * 7
+
+# Mentions replied to whose replied_status hasn't been written to Supabase yet
+UNRECONCILED_KEY = "reply_outbox:unreconciled"
+
+# Records the reply intent unless the mention already has one, and returns the
+# mention's record either way.
+#
+# KEYS[1] = outbox hash
+# ARGV = message, now, ttl seconds
+BEGIN_REPLY_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('HSET', KEYS[1], 'state', 'pending', 'message', ARGV[1], 'created_at', ARGV[2])
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return redis.call('HGETALL', KEYS[1])
+"""
+
+
+async def begin_reply(redis, tweet_id: int, message: str) -> dict:
+    """
+    Records the intent to reply to a mention.
+
+    Returns:
+        dict: The mention's outbox record. `state` is "sent" if it was already
+        answered, else "pending"; `message` is the text to send, which is the
+        originally recorded one when the reply is being retried.
+    """
+    flat = await redis.eval(
+        BEGIN_REPLY_SCRIPT,
+        1,
+        OUTBOX_KEY.format(tweet_id=tweet_id),
+        message,
+        int(time.time()),
+        OUTBOX_TTL,
+    )
+    return dict(zip(flat[::2], flat[1::2]))
+
+
+async def complete_reply(redis, tweet_id: int, reply_id: Optional[str]):
+    """Marks a mention's reply as sent and queues its replied_status for reconciliation."""
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.hset(
+            OUTBOX_KEY.format(tweet_id=tweet_id),
+            mapping={"state": "sent", "reply_id": reply_id or "", "sent_at": int(time.time())},
+        )
+        pipe.sadd(UNRECONCILED_KEY, tweet_id)
+        await pipe.execute()
+
+
+async def sent_replies(redis, tweet_ids: Iterable[int]) -> Set[int]:
+    """Returns which of the given mentions already have a sent reply in the outbox."""
+    tweet_ids = list(tweet_ids)
+    if not tweet_ids:
+        return set()
+
+    async with redis.pipeline(transaction=False) as pipe:
+        for tweet_id in tweet_ids:
+            pipe.hget(OUTBOX_KEY.format(tweet_id=tweet_id), "state")
+        states = await pipe.execute()
+
+    return {tweet_id for tweet_id, state in zip(tweet_ids, states) if state == "sent"}
+
+
+async def unreconciled_replies(redis, count: int) -> List[int]:
+    """Returns up to `count` replied mentions still waiting for their status write."""
+    return [int(tweet_id) for tweet_id in await redis.srandmember(UNRECONCILED_KEY, count)]
+
+
+async def mark_reconciled(redis, tweet_ids: Iterable[int]):
+    """Drops mentions whose replied_status has been written from the reconciliation set."""
+    tweet_ids = list(tweet_ids)
+    if tweet_ids:
+        await redis.srem(UNRECONCILED_KEY, *tweet_ids)
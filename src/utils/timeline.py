@@ -0,0 +1,69 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import List, Optional
+
+
+class TimelineSnapshot:
+    """
+    An incrementally refreshed, size-bounded copy of the home timeline.
+
+    Reads are served from memory. At most once per `refresh_interval` a read
+    triggers a refresh that fetches only tweets newer than the newest one held
+    (since_id) and pushes them onto a ring buffer, dropping the oldest. If the
+    refresh fails or has no budget, the current snapshot is served as is. If
+    it couldn't fetch every newer tweet, the snapshot is replaced rather than
+    merged, so it never has a gap in the middle.
+
+    Args:
+        fetch: Coroutine function (since_id) -> (tweets, complete), where tweets
+            are dicts, newest first, and complete is False if tweets newer than
+            since_id were left unfetched; or None when there is no budget for a
+            call right now.
+        max_size (int): Tweets kept.
+        refresh_interval (float): Minimum seconds between refreshes.
+    """
+
+    def __init__(self, fetch, max_size: int, refresh_interval: float):
+        self.fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.tweets = deque(maxlen=max_size)  # newest first
+        self.newest_id: Optional[int] = None
+        self.refreshed_at = float("-inf")
+        self.lock = asyncio.Lock()
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.refreshed_at >= self.refresh_interval
+
+    async def refresh(self):
+        """Merges tweets newer than the snapshot into it; concurrent readers share one fetch."""
+        async with self.lock:
+            if not self.is_stale():  # refreshed while we waited for the lock
+                return
+            self.refreshed_at = time.monotonic()
+
+            try:
+                result = await self.fetch(self.newest_id)
+            except Exception as e:
+                print(f"Error refreshing timeline snapshot, serving {len(self.tweets)} cached tweets: {e}")
+                return
+            if result is None:
+                return
+
+            tweets, complete = result
+            if not complete and self.tweets:
+                print(f"Timeline snapshot fell behind, dropping {len(self.tweets)} cached tweets")
+                self.tweets.clear()
+            if not tweets:
+                return
+
+            # extendleft reverses, so push oldest first to keep newest at the front
+            self.tweets.extendleft(reversed(tweets))
+            self.newest_id = max(self.newest_id or 0, *(int(tweet["id"]) for tweet in tweets))
+
+    async def read(self, count: int) -> List[dict]:
+        """Returns up to `count` of the newest tweets."""
+        if self.is_stale():
+            await self.refresh()
+        return list(itertools.islice(self.tweets, count))
@@ -0,0 +1,201 @@
+import bisect
+import heapq
+import json
+import re
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Set
+
+from src.utils.functions import parse_tweet, parse_tweets
+
+INDEX_TWEETS_KEY = "tweet_index:tweets"  # hash: tweet id -> tweet JSON
+INDEX_IDS_KEY = "tweet_index:ids"  # sorted set of tweet ids, for trimming
+
+WORD = re.compile(r"\w+")
+QUERY_TERM = re.compile(r"[#$@]?\w+\*?")
+
+
+def author_term(author_id) -> str:
+    return f"from:{author_id}"
+
+
+def parse_query(query: str) -> List[List[str]]:
+    """
+    Splits a query into its OR clauses, each a list of terms that must all match.
+
+    Terms are words and tags, optionally ending in * for a prefix, and emojis.
+    """
+    clauses = []
+    for clause in re.split(r"\s+OR\s+", query.strip()):
+        terms = QUERY_TERM.findall(clause.lower()) + parse_tweet(clause)["parsed_data"]["emojis"]
+        if terms:
+            clauses.append(terms)
+    return clauses
+
+
+def tweet_terms(tweet: dict, parsed: dict) -> Set[str]:
+    """
+    The terms a tweet is indexed under.
+
+    Words of the main text, plus hashtags, cashtags and mentions both with and
+    without their sigil (so "btc" finds "$BTC" and "#BTC", while "$btc" only
+    finds the cashtag), emojis, and the author.
+    """
+    data = parsed["parsed_data"]
+    terms = set()
+    for line in data["main_text_lines"]:
+        terms.update(WORD.findall(line.lower()))
+    for tag in (*data["hashtags"], *data["cashtags"], *data["mentions"]):
+        tag = tag.lower()
+        terms.add(tag)
+        terms.add(tag[1:])
+    terms.update(data["emojis"])
+    if tweet.get("author_id"):
+        terms.add(author_term(tweet["author_id"]))
+    return terms
+
+
+class TweetIndex:
+    """
+    In-memory inverted index over every tweet the agent has ingested.
+
+    Each term maps to the ascending ids of the tweets containing it, and the
+    vocabulary is kept sorted so a prefix is a bisected slice of it. A query
+    walks its rarest term's ids newest first and stops once it has enough
+    hits. Beyond max_size tweets, the oldest ingested are dropped.
+
+    Queries are whitespace-separated terms, all of which must match (AND);
+    clauses joined by OR match if any of them does. A trailing * makes a term
+    a prefix: "eth* OR $sol etf".
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.tweets = OrderedDict()  # tweet id -> tweet, oldest ingested first
+        self.terms: Dict[int, Set[str]] = {}  # tweet id -> its terms, for AND checks and eviction
+        self.postings: Dict[str, List[int]] = {}  # term -> tweet ids, ascending
+        self.vocabulary: List[str] = []  # sorted terms
+
+    def __len__(self):
+        return len(self.tweets)
+
+    def add(self, tweets: Iterable[dict]) -> List[dict]:
+        """
+        Indexes tweets ({"id", "text"} and optionally "author_id"), skipping known ids.
+
+        Returns:
+            list: The tweets that were new to the index.
+        """
+        new = [tweet for tweet in tweets if int(tweet["id"]) not in self.tweets]
+        for tweet, parsed in zip(new, parse_tweets(tweet["text"] for tweet in new)):
+            tweet_id = int(tweet["id"])
+            terms = tweet_terms(tweet, parsed)
+            self.tweets[tweet_id] = tweet
+            self.terms[tweet_id] = terms
+            for term in terms:
+                posting = self.postings.get(term)
+                if posting is None:
+                    posting = self.postings[term] = []
+                    bisect.insort(self.vocabulary, term)
+                # Ids mostly arrive in increasing order, so this is usually an append
+                bisect.insort(posting, tweet_id)
+
+        while len(self.tweets) > self.max_size:
+            self.remove(next(iter(self.tweets)))
+        return new
+
+    def remove(self, tweet_id: int):
+        self.tweets.pop(tweet_id, None)
+        for term in self.terms.pop(tweet_id, ()):
+            posting = self.postings[term]
+            del posting[bisect.bisect_left(posting, tweet_id)]
+            if not posting:
+                del self.postings[term]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, term)]
+
+    def expand(self, term: str) -> List[str]:
+        """The indexed terms a query term matches: itself, or every term starting with it if it ends in *."""
+        if not term.endswith("*"):
+            return [term] if term in self.postings else []
+        prefix = term[:-1]
+        vocabulary = self.vocabulary
+        return vocabulary[
+            bisect.bisect_left(vocabulary, prefix):bisect.bisect_left(vocabulary, prefix + "\U0010ffff")
+        ]
+
+    def search(self, query: str, count: int = 100, author_id=None) -> List[dict]:
+        """Returns up to `count` of the newest tweets matching the query, optionally by one author."""
+        matches = []
+        for terms in parse_query(query):
+            if author_id is not None:
+                terms.append(author_term(author_id))
+            matches.extend(self.search_clause(terms, count))
+
+        return [self.tweets[tweet_id] for tweet_id in heapq.nlargest(count, set(matches))]
+
+    def matcher(self, query: str) -> Callable[[dict], bool]:
+        """Returns a test of whether an indexed tweet matches the query, for filtering a stream of tweets."""
+        clauses = parse_query(query)
+
+        def matches(tweet: dict) -> bool:
+            terms = self.terms.get(int(tweet["id"]))
+            return terms is not None and any(
+                all(not terms.isdisjoint(self.expand(term)) for term in clause) for clause in clauses
+            )
+
+        return matches
+
+    def search_clause(self, terms: List[str], count: int) -> List[int]:
+        """The newest `count` ids matching every term."""
+        expanded = []
+        for term in set(terms):
+            matched = self.expand(term)
+            if not matched:
+                return []
+            expanded.append((sum(len(self.postings[t]) for t in matched), matched))
+        expanded.sort(key=lambda item: item[0])
+
+        # Walk the rarest term's ids newest first, checking the other terms
+        # against each tweet's own terms, and stop after `count` hits.
+        # A prefix term walks its terms' ids merged (repeats are adjacent).
+        driver = expanded[0][1]
+        others = [set(matched) for _, matched in expanded[1:]]
+        if len(driver) == 1:
+            ids = reversed(self.postings[driver[0]])
+        else:
+            ids = heapq.merge(*(reversed(self.postings[t]) for t in driver), reverse=True)
+
+        hits = []
+        previous = None
+        for tweet_id in ids:
+            if tweet_id == previous:
+                continue
+            previous = tweet_id
+            tweet_terms = self.terms[tweet_id]
+            if all(not tweet_terms.isdisjoint(other) for other in others):
+                hits.append(tweet_id)
+                if len(hits) == count:
+                    break
+        return hits
+
+    async def persist(self, redis, tweets: List[dict]):
+        """Saves newly indexed tweets to Redis, trimmed to max_size, so other processes and restarts can load them."""
+        if not tweets:
+            return
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hset(INDEX_TWEETS_KEY, mapping={tweet["id"]: json.dumps(tweet) for tweet in tweets})
+            pipe.zadd(INDEX_IDS_KEY, {tweet["id"]: int(tweet["id"]) for tweet in tweets})
+            await pipe.execute()
+
+        overflow = await redis.zcard(INDEX_IDS_KEY) - self.max_size
+        if overflow > 0:
+            stale = await redis.zrange(INDEX_IDS_KEY, 0, overflow - 1)
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.hdel(INDEX_TWEETS_KEY, *stale)
+                pipe.zrem(INDEX_IDS_KEY, *stale)
+                await pipe.execute()
+
+    async def load(self, redis) -> int:
+        """Indexes the tweets persisted in Redis. Returns how many were new."""
+        stored = await redis.hvals(INDEX_TWEETS_KEY)
+        tweets = sorted((json.loads(raw) for raw in stored), key=lambda tweet: int(tweet["id"]))
+        return len(self.add(tweets))
@@ -0,0 +1,90 @@
+import re
+
+from src.config import (
+    WEB_SEARCH_CACHE_SIZE,
+    WEB_SEARCH_TTL_DEFAULT,
+    WEB_SEARCH_TTL_NEWS,
+    WEB_SEARCH_TTL_PRICE,
+    get_redis,
+)
+from src.services import services
+from src.utils.cache import LRUCache, get_or_compute, inflight, normalize_key
+from src.utils.metrics import cache_requests_total
+
+WEB_SEARCH_CACHE_KEY = "web_search:{query}"
+
+# The longest a process serves its local copy without going back to Redis,
+# so local copies can't drift far behind an entry refreshed elsewhere
+LOCAL_MAX_AGE = 60
+
+# Query classes, checked in order, with how long their results stay fresh.
+# Prices move by the minute and news by the hour; anything else is evergreen
+# enough to keep for hours.
+QUERY_CLASSES = (
+    (
+        "price",
+        re.compile(r"\$[a-z]{2,10}\b|\b(?:price|prices|market cap|mcap|ath|pump|dump|chart|trading at|worth)\b"),
+        WEB_SEARCH_TTL_PRICE,
+    ),
+    (
+        "news",
+        re.compile(r"\b(?:news|today|latest|breaking|announce\w*|launch\w*|update\w*|this week|yesterday|now)\b"),
+        WEB_SEARCH_TTL_NEWS,
+    ),
+)
+
+# normalized query -> results, for this process
+local_results = LRUCache(WEB_SEARCH_CACHE_SIZE)
+
+
+class SearchFailed(Exception):
+    """Tavily answered with an error message instead of results."""
+
+
+def classify_query(query: str):
+    """Returns the (class, ttl) of a normalized query."""
+    for name, pattern, ttl in QUERY_CLASSES:
+        if pattern.search(query):
+            return name, ttl
+    return "default", WEB_SEARCH_TTL_DEFAULT
+
+
+async def search_web(query: str):
+    """
+    Searches the web with Tavily, caching results per normalized query.
+
+    Lookups go to this process's LRU first, then to Redis (shared by every
+    worker). Concurrent misses for the same query share one Tavily call.
+    Results stay fresh for their query class's TTL. A failed search is not
+    cached; its error message is returned for the agent to work with.
+    """
+    key = normalize_key(query)
+    results = local_results.get(key)
+    if results is not None:
+        cache_requests_total.inc(cache="web_search", result="local")
+        return results
+
+    query_class, ttl = classify_query(key)
+    cache_key = WEB_SEARCH_CACHE_KEY.format(query=key)
+    outcome = "coalesced" if cache_key in inflight else "redis"
+
+    async def compute():
+        nonlocal outcome
+        outcome = "miss"
+        results = await services.search.ainvoke(query)
+        # The Tavily tool reports failures as a string rather than raising
+        if isinstance(results, str):
+            raise SearchFailed(results)
+        return results
+
+    try:
+        results = await get_or_compute(get_redis(), cache_key, ttl, compute)
+    except SearchFailed as e:
+        cache_requests_total.inc(cache="web_search", result="error")
+        print(f"Web search for '{key}' failed, not caching: {e}")
+        return str(e)
+    cache_requests_total.inc(cache="web_search", result=outcome)
+    print(f"Web search for '{key}' ({query_class}): {outcome}")
+
+    local_results.set(key, results, min(ttl, LOCAL_MAX_AGE))
+    return results
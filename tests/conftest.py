@@ -0,0 +1,34 @@
+import pytest
+from fakeredis import aioredis
+
+from src import config, main
+from src.benchmarks.hot_paths import install_fakes
+from src.services import services
+from src.utils import functions, rate_limiter
+
+
+@pytest.fixture
+def fakes(monkeypatch):
+    """
+    Installs the benchmark fakes (see install_fakes) on a fresh fakeredis and
+    puts back everything they replaced when the test ends. Yields the redis.
+    """
+    for module, name in [
+        (config, "redis"),
+        (main, "redis"),
+        (rate_limiter, "ENDPOINT_LIMITS"),
+        (functions, "OPENAI_RPM_LIMIT"),
+        (functions, "OPENAI_TPM_LIMIT"),
+    ]:
+        monkeypatch.setattr(module, name, getattr(module, name))
+
+    # Services are cached_property values in the instance dict; snapshotting
+    # the dict (rather than reading each attribute) never builds a real client.
+    built = dict(services.__dict__)
+
+    redis = aioredis.FakeRedis(decode_responses=True)
+    install_fakes(redis)
+    yield redis
+
+    services.__dict__.clear()
+    services.__dict__.update(built)
@@ -0,0 +1,30 @@
+import asyncio
+
+from src import twitter_functions
+from src.utils.timeline import TimelineSnapshot
+from src.utils.tweet_index import TweetIndex
+
+
+def test_search_only_returns_home_timeline_tweets(monkeypatch):
+    index = TweetIndex(max_size=100)
+    timeline = [
+        {"id": 3, "text": "$ETH breaking out"},
+        {"id": 2, "text": "quiet day for $BTC"},
+        {"id": 1, "text": "$ETH gas is cheap"},
+    ]
+
+    async def fetch(since_id):
+        index.add(timeline)
+        return timeline, True
+
+    # Found by a user or keyword search, never on the home timeline
+    index.add([{"id": 4, "text": "$ETH to the moon", "author_id": 99}])
+
+    monkeypatch.setattr(twitter_functions, "tweet_index", index)
+    monkeypatch.setattr(
+        twitter_functions, "home_timeline", TimelineSnapshot(fetch, max_size=10, refresh_interval=60)
+    )
+
+    result = asyncio.run(twitter_functions.fetch_tweets(count=10, search="$eth"))
+
+    assert [tweet["id"] for tweet in result["data"]] == [3, 1]
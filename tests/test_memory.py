@@ -0,0 +1,31 @@
+from langchain_core.messages import AIMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.prebuilt import create_react_agent
+
+from src.utils.memory import BoundedMemorySaver, windowed_state_modifier
+
+
+def test_long_conversation_stores_only_the_history_window():
+    memory = BoundedMemorySaver(max_messages=10)
+    prompt_sizes = []
+
+    def model(messages):
+        prompt_sizes.append(len(messages))
+        return AIMessage(content=f"reply to {messages[-1].content}")
+
+    agent = create_react_agent(
+        model=RunnableLambda(model),
+        tools=[],
+        checkpointer=memory,
+        state_modifier=windowed_state_modifier(SystemMessage(content="system"), 10),
+    )
+    config = {"configurable": {"thread_id": "conversation-1"}}
+
+    for turn in range(200):
+        agent.invoke({"messages": [("user", f"turn {turn}")]}, config)
+
+    stored = memory.get(config)["channel_values"]["messages"]
+    assert len(stored) == 10
+    assert [message.content for message in stored[-2:]] == ["turn 199", "reply to turn 199"]
+    # The model still gets the system message plus the full window
+    assert max(prompt_sizes) == 10
@@ -0,0 +1,26 @@
+import asyncio
+
+import pytest
+from fakeredis import aioredis
+from redis.exceptions import ResponseError
+
+from src.utils.mention_queue import MENTION_STREAM, QUEUED_KEY, publish_mentions
+
+
+def test_failed_publish_leaves_no_marker_so_the_mention_is_published_again():
+    async def scenario():
+        redis = aioredis.FakeRedis(decode_responses=True)
+        tweet = {"id": 1_234, "conversation_id": 1_234, "original_tweet": "@bot hi"}
+
+        # A stream key of the wrong type makes the XADD fail
+        await redis.set(MENTION_STREAM, "not a stream")
+        with pytest.raises(ResponseError):
+            await publish_mentions(redis, [tweet])
+        assert not await redis.exists(QUEUED_KEY.format(tweet_id=tweet["id"]))
+
+        await redis.delete(MENTION_STREAM)
+        assert await publish_mentions(redis, [tweet]) == 1
+        assert await publish_mentions(redis, [tweet]) == 0
+        assert await redis.xlen(MENTION_STREAM) == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,70 @@
+import asyncio
+
+from src import main
+from src.benchmarks.fakes import SAMPLE_TWEETS, FakeTwitterClient
+from src.services import services
+from src.utils.mention_queue import (
+    MENTION_GROUP,
+    MENTION_STREAM,
+    claim_stale_mentions,
+    ensure_mention_group,
+    publish_mentions,
+    read_new_mentions,
+)
+from src.utils.reply_outbox import OUTBOX_KEY
+
+
+class FlakyTwitterClient(FakeTwitterClient):
+    """Fails the first create_tweet like a Twitter 5xx, then records what it sends."""
+
+    def __init__(self):
+        super().__init__()
+        self.failures = 1
+        self.sent = []
+
+    def create_tweet(self, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("503 Service Unavailable")
+        self.sent.append(kwargs["text"])
+        return super().create_tweet(**kwargs)
+
+
+async def pending_count(redis) -> int:
+    return (await redis.xpending(MENTION_STREAM, MENTION_GROUP))["pending"]
+
+
+def test_failed_reply_is_redelivered_and_resends_the_recorded_message(fakes):
+    async def scenario():
+        redis = fakes
+        twitter = services.twitter = FlakyTwitterClient()
+        await ensure_mention_group(redis)
+
+        tweet_id = 1_234
+        await publish_mentions(
+            redis, [{"id": tweet_id, "conversation_id": tweet_id, "original_tweet": SAMPLE_TWEETS[1]}]
+        )
+
+        # First delivery: the reply is recorded, create_tweet fails, nothing is acked
+        services.agent.reply = "first reply"
+        await main.process_mentions(await read_new_mentions(redis, "worker-1", count=10, block_ms=None))
+
+        assert twitter.sent == []
+        assert await pending_count(redis) == 1
+        record = await redis.hgetall(OUTBOX_KEY.format(tweet_id=tweet_id))
+        assert record["state"] == "pending"
+        assert record["message"] == "first reply"
+
+        # Redelivery: the recorded message is sent, not a newly composed one, then acked
+        services.agent.reply = "second reply"
+        entries = await claim_stale_mentions(
+            redis, "worker-2", min_idle_ms=0, count=10, max_deliveries=5
+        )
+        assert [tweet["id"] for _, tweet in entries] == [tweet_id]
+        await main.process_mentions(entries)
+
+        assert twitter.sent == ["first reply"]
+        assert await pending_count(redis) == 0
+        assert await redis.hget(OUTBOX_KEY.format(tweet_id=tweet_id), "state") == "sent"
+
+    asyncio.run(scenario())
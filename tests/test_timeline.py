@@ -0,0 +1,28 @@
+import asyncio
+
+from src.utils.timeline import TimelineSnapshot
+
+
+def tweets(*ids):
+    return [{"id": tweet_id, "text": f"tweet {tweet_id}"} for tweet_id in ids]
+
+
+def test_refresh_that_cannot_reach_the_snapshot_replaces_it():
+    async def scenario():
+        pages = iter([(tweets(3, 2, 1), True), (tweets(6, 5), True), (tweets(20, 19), False)])
+        since_ids = []
+
+        async def fetch(since_id):
+            since_ids.append(since_id)
+            return next(pages)
+
+        snapshot = TimelineSnapshot(fetch, max_size=10, refresh_interval=0)
+
+        assert [t["id"] for t in await snapshot.read(10)] == [3, 2, 1]
+        # Everything newer than 3 was fetched: merged
+        assert [t["id"] for t in await snapshot.read(10)] == [6, 5, 3, 2, 1]
+        # Tweets 7-18 were left unfetched: the snapshot restarts from the new tweets
+        assert [t["id"] for t in await snapshot.read(10)] == [20, 19]
+        assert since_ids == [None, 3, 6]
+
+    asyncio.run(scenario())
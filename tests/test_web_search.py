@@ -0,0 +1,48 @@
+import asyncio
+
+from fakeredis import aioredis
+
+from src import config
+from src.services import services
+from src.utils import web_search
+from src.utils.cache import LRUCache
+from src.utils.web_search import WEB_SEARCH_CACHE_KEY, search_web
+
+TAVILY_ERROR = "HTTPError('502 Server Error: Bad Gateway for url: https://api.tavily.com/search')"
+RESULTS = [{"url": "https://example.com/sol", "content": "SOL is up 4% today."}]
+
+
+class FlakySearch:
+    """Answers like TavilySearchResults: an error string on the first call, then results."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, query):
+        self.calls += 1
+        return TAVILY_ERROR if self.calls == 1 else RESULTS
+
+
+def test_failed_search_is_not_cached(monkeypatch):
+    redis = aioredis.FakeRedis(decode_responses=True)
+    search = FlakySearch()
+    monkeypatch.setattr(config, "redis", redis)
+    # Set in the instance dict, so the real Tavily client is never built
+    monkeypatch.setitem(services.__dict__, "search", search)
+    monkeypatch.setattr(web_search, "local_results", LRUCache(16))
+
+    async def scenario():
+        query = "what is the story with solana"
+        key = WEB_SEARCH_CACHE_KEY.format(query=query)
+
+        assert await search_web(query) == TAVILY_ERROR
+        assert await redis.get(key) is None
+        assert web_search.local_results.get(query) is None
+
+        # The next search goes back to Tavily and its results are cached
+        assert await search_web(query) == RESULTS
+        assert await search_web(query) == RESULTS
+        assert search.calls == 2
+        assert await redis.get(key) is not None
+
+    asyncio.run(scenario())